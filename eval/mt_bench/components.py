@@ -19,12 +19,35 @@ def run_mt_bench_op(
     best_score_file: Optional[str] = None,
 ) -> NamedTuple("outputs", best_model=str, best_score=float):
     import json
+    import multiprocessing
     import os
+    import queue
+    import ssl
     import subprocess
+    import sys
+    import time
+    from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+    from urllib.parse import urlparse
 
     import httpx
-    import torch
+    import requests
     from instructlab.eval.mt_bench import MTBenchEvaluator
+    from instructlab.model.backends.common import free_tcp_ipv4_port
+    from instructlab.model.backends.vllm import wait_for_stable_vram
+
+    # orjson is much faster than the stdlib encoder for the large qa_pairs reports, fall back
+    # to json when it is not available in the image
+    try:
+        import orjson
+
+        def json_dumps(data) -> bytes:
+            return orjson.dumps(
+                data, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY
+            )
+    except ImportError:
+
+        def json_dumps(data) -> bytes:
+            return json.dumps(data, indent=2).encode("utf-8")
 
     judge_api_key = os.getenv("JUDGE_API_KEY", "")
     judge_model_name = os.getenv("JUDGE_NAME")
@@ -33,18 +56,40 @@ def run_mt_bench_op(
     use_tls = os.path.exists(judge_ca_cert_path) and (
         os.path.getsize(judge_ca_cert_path) > 0
     )
-    judge_http_client = httpx.Client(verify=judge_ca_cert_path) if use_tls else None
+    # Load the CA bundle once, httpx would otherwise parse the certificate file again for
+    # every client it builds
+    judge_ssl_context = (
+        ssl.create_default_context(cafile=judge_ca_cert_path) if use_tls else True
+    )
+    # The judge is a remote endpoint, so its throughput is bound by network round trips
+    # rather than local CPU. Keep a large pool of keep-alive connections and multiplex the
+    # requests over HTTP/2 when the h2 package is available.
+    try:
+        import h2  # noqa: F401
+
+        http2 = True
+    except ImportError:
+        http2 = False
+    judge_http_client = httpx.Client(
+        http2=http2,
+        limits=httpx.Limits(max_connections=256, max_keepalive_connections=64),
+        timeout=httpx.Timeout(600.0, connect=10.0),
+        verify=judge_ssl_context,
+    )
 
     def launch_vllm(
-        model_path: str, gpu_count: int, retries: int = 120, delay: int = 10
+        model_path: str,
+        gpu_count: int,
+        timeout: int = 1200,
+        visible_devices: str = None,
+        max_num_seqs: int = 512,
+        max_num_batched_tokens: int = 16384,
+        block_size: int = 32,
+        enable_prefix_caching: bool = True,
+        gpu_memory_utilization: float = 0.93,
+        quantization: str = None,
+        kv_cache_dtype: str = None,
     ) -> tuple:
-        import subprocess
-        import sys
-        import time
-
-        import requests
-        from instructlab.model.backends.common import free_tcp_ipv4_port
-
         free_port = free_tcp_ipv4_port("127.0.0.1")
         port = str(free_port)
         vllm_server = f"http://127.0.0.1:{port}/v1"
@@ -57,40 +102,79 @@ def run_mt_bench_op(
             port,
             "--model",
             model_path,
+            "--max-num-seqs",
+            str(max_num_seqs),
+            "--block-size",
+            str(block_size),
+            "--gpu-memory-utilization",
+            str(gpu_memory_utilization),
+            "--disable-log-requests",
         ]
+        if max_num_batched_tokens:
+            # vLLM refuses to start when the batched tokens budget is lower than the model
+            # context length, so never go below it
+            try:
+                with open(f"{model_path}/config.json", "r", encoding="utf-8") as f:
+                    max_model_len = json.load(f).get("max_position_embeddings", 0)
+            except (OSError, ValueError):
+                max_model_len = 0
+            command += [
+                "--max-num-batched-tokens",
+                str(max(max_num_batched_tokens, max_model_len)),
+            ]
+        # MT-Bench prompts share the same system prompt, so cached prefixes are reused
+        if enable_prefix_caching:
+            command += ["--enable-prefix-caching"]
+        if quantization:
+            command += ["--quantization", quantization]
+        if kv_cache_dtype:
+            command += ["--kv-cache-dtype", kv_cache_dtype]
         if gpu_count > 0:
             command += [
                 "--tensor-parallel-size",
                 str(gpu_count),
             ]
 
-        process = subprocess.Popen(args=command)
+        env = None
+        if visible_devices is not None:
+            env = {**os.environ, "CUDA_VISIBLE_DEVICES": visible_devices}
+
+        process = subprocess.Popen(args=command, env=env)
 
         print(f"Waiting for vLLM server to start at {vllm_server}...")
 
-        for attempt in range(retries):
+        # vLLM typically starts in 15-60 seconds, poll the lightweight health endpoint with
+        # an exponential backoff instead of a fixed 10 seconds delay
+        health_url = f"http://127.0.0.1:{port}/health"
+        deadline = time.monotonic() + timeout
+        delay = 0.5
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(
+                    f"vLLM server exited with code {process.returncode} before becoming ready."
+                )
             try:
-                response = requests.get(f"{vllm_server}/models")
+                response = requests.get(health_url, timeout=1)
                 if response.status_code == 200:
                     print(f"vLLM server is up and running at {vllm_server}.")
                     return process, vllm_server
-            except requests.ConnectionError:
+            except requests.RequestException:
                 pass
 
-            print(
-                f"Server not available yet, retrying in {delay} seconds (Attempt {attempt + 1}/{retries})..."
-            )
+            print(f"Server not available yet, retrying in {delay:.1f} seconds...")
             time.sleep(delay)
+            delay = min(delay * 1.5, 10)
 
         raise RuntimeError(
-            f"Failed to start vLLM server at {vllm_server} after {retries} retries."
+            f"Failed to start vLLM server at {vllm_server} after {timeout} seconds."
         )
 
-    def shutdown_vllm(process: subprocess.Popen, timeout: int = 20):
-        import subprocess
-
-        from instructlab.model.backends.vllm import wait_for_stable_vram
-
+    def shutdown_vllm(
+        process: subprocess.Popen,
+        visible_devices: str = None,
+        concurrent_servers: bool = False,
+        timeout: int = 20,
+    ):
         try:
             process.terminate()
             process.wait(timeout=timeout)
@@ -112,69 +196,141 @@ def run_mt_bench_op(
         # vLLM relies on stable VRAM,  residual reclamation activity
         # can lead to crashes on restart. To prevent this add a
         # short delay (typically ~ 10 seconds, max 30) to verify stability.
-        wait_for_stable_vram(30)
+        # When the GPUs of the stopped server are already back to their idle usage the short
+        # delay is enough. Only those GPUs are measured, other servers may use the others.
+        if not concurrent_servers:
+            wait_for_stable_vram(10 if gpus_back_to_idle(visible_devices) else 30)
+            return
+        # wait_for_stable_vram watches every GPU of this process, the servers still running on
+        # the other GPUs would keep it from settling. Wait for the GPUs of the stopped server
+        # to be back to their idle usage instead.
+        deadline = time.monotonic() + 30
+        while not gpus_back_to_idle(visible_devices) and time.monotonic() < deadline:
+            time.sleep(1)
+
+    # gpu_memory returns the (index, uuid, used, total) memory of every GPU as reported by
+    # nvidia-smi
+    def gpu_memory():
+        try:
+            output = subprocess.run(
+                [
+                    "nvidia-smi",
+                    "--query-gpu=index,uuid,memory.used,memory.total",
+                    "--format=csv,noheader,nounits",
+                ],
+                capture_output=True,
+                check=True,
+                text=True,
+            ).stdout
+            return [
+                (index, uuid, int(used), int(total))
+                for index, uuid, used, total in (
+                    (field.strip() for field in line.split(","))
+                    for line in output.splitlines()
+                )
+            ]
+        except (OSError, ValueError, subprocess.CalledProcessError):
+            return None
+
+    # gpus_back_to_idle tells whether the given GPUs, all of them by default, use no more
+    # memory than before any vLLM server was started. CUDA_VISIBLE_DEVICES style device
+    # lists may name the GPUs by index or by UUID.
+    def gpus_back_to_idle(visible_devices: str = None) -> bool:
+        memory = gpu_memory()
+        if memory is None or idle_gpu_memory is None:
+            return False
+        devices = (
+            {device.strip() for device in visible_devices.split(",")}
+            if visible_devices
+            else None
+        )
+        idle_used = {index: used for index, _, used, _ in idle_gpu_memory}
+        measured = [
+            (index, used, total)
+            for index, uuid, used, total in memory
+            if devices is None or index in devices or uuid in devices
+        ]
+        return bool(measured) and all(
+            index in idle_used and used - idle_used[index] <= 0.02 * total
+            for index, used, total in measured
+        )
 
-    gpu_available = torch.cuda.is_available()
-    gpu_name = (
-        torch.cuda.get_device_name(torch.cuda.current_device())
-        if gpu_available
-        else "No GPU available"
-    )
-    gpu_count = torch.cuda.device_count() if gpu_available else 0
+    # Probe the GPUs with nvidia-smi rather than importing torch, the component itself never
+    # runs tensor ops and the import alone costs seconds and hundreds of MB per launch
+    def list_gpus():
+        try:
+            output = subprocess.run(
+                [
+                    "nvidia-smi",
+                    "--query-gpu=name,memory.total",
+                    "--format=csv,noheader,nounits",
+                ],
+                capture_output=True,
+                check=True,
+                text=True,
+            ).stdout
+            return [
+                (name.strip(), int(total) * 1024 * 1024)
+                for name, total in (line.rsplit(",", 1) for line in output.splitlines())
+            ]
+        except (OSError, ValueError, subprocess.CalledProcessError):
+            return []
+
+    gpus = list_gpus()
+    gpu_available = bool(gpus)
+    gpu_name = gpus[0][0] if gpu_available else "No GPU available"
+    visible = os.getenv("CUDA_VISIBLE_DEVICES")
+    if not gpu_available:
+        gpu_count = 0
+    elif visible is not None:
+        gpu_count = len([device for device in visible.split(",") if device.strip()])
+    else:
+        gpu_count = len(gpus)
+    # GPU usage before any vLLM server is started
+    idle_gpu_memory = gpu_memory()
 
     print(f"GPU Available: {gpu_available}, {gpu_name}")
 
-    models_list = os.listdir(models_folder)
-
     scores = {}
-    all_mt_bench_data = []
 
     # generate_answers,judgment uses a magic word for its mt_bench evaluator  - 'auto'
     # with 'auto', number of gpus allocated for serving is calculated based on environment
     # https://github.com/instructlab/eval/blob/main/src/instructlab/eval/mt_bench.py#L36
-    if max_workers == "auto":
-        try:
-            usable_cpu_count = len(os.sched_getaffinity(0)) // 2
-        except AttributeError:
-            import multiprocessing
-
-            usable_cpu_count = multiprocessing.cpu_count() // 2
+    judge_max_workers = max_workers
+    auto_max_workers = max_workers == "auto"
+    if auto_max_workers:
+        usable_cpu_count = (
+            len(os.sched_getaffinity(0))
+            if hasattr(os, "sched_getaffinity")
+            else multiprocessing.cpu_count()
+        ) // 2
         max_workers = usable_cpu_count
+        # Judging is I/O bound, so it can use many more workers than answer generation
+        judge_max_workers = min(256, 8 * usable_cpu_count)
+
+    # only keep model directories, ignoring any jsonl files present in the directory
+    with os.scandir(models_folder) as entries:
+        models_list = [
+            entry.name
+            for entry in entries
+            if entry.is_dir(follow_symlinks=False) and not entry.name.endswith(".jsonl")
+        ]
+    # Judging is a remote, network bound call which leaves the local GPU idle, so while
+    # model N is judged we already generate the answers of model N+1. A local judge would
+    # contend with vLLM for the GPU, in which case each model is judged before moving on.
+    judge_host = urlparse(judge_endpoint or "").hostname
+    overlap_judging = judge_host not in (None, "localhost", "127.0.0.1", "::1")
 
-    # modify model_list to ignore any jsonl files present in the directory
-    models_list = [model for model in models_list if not model.endswith(".jsonl")]
-    for model_name in models_list:
-        print(f"Serving candidate model: {model_name}")
-        model_path = f"{models_folder}/{model_name}"
-
-        vllm_process, vllm_server = launch_vllm(model_path, gpu_count)
-
-        # model ID is the model_path value in vLLM
-        evaluator = MTBenchEvaluator(
-            model_name=model_path,
-            judge_model_name=judge_model_name,
-            output_dir="/tmp/eval_output",
-            merge_system_user_message=merge_system_user_message,
-        )
-
-        evaluator.gen_answers(
-            server_url=vllm_server,
-            serving_gpus=gpu_count,
-            max_workers=max_workers,
-            http_client=judge_http_client,
-        )
-
-        shutdown_vllm(vllm_process)
-
+    def judge_model(evaluator, model_path):
         overall_score, qa_pairs, turn_scores, error_rate = evaluator.judge_answers(
             server_url=judge_endpoint,
             api_key=judge_api_key,
             serving_gpus=gpu_count,
-            max_workers=max_workers,
+            max_workers=judge_max_workers,
             http_client=judge_http_client,
         )
 
-        mt_bench_data = {
+        return {
             "report_title": "SKILLS EVALUATION REPORT",
             "model": model_path,
             "judge_model": judge_model_name,
@@ -184,27 +340,123 @@ def run_mt_bench_op(
             "error_rate": error_rate,
         }
 
-        all_mt_bench_data.append(mt_bench_data)
-        scores[model_path] = overall_score
-
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(all_mt_bench_data, f, indent=4)
+    # Tensor parallelism only pays off for models which do not fit on a single GPU, for
+    # smaller models the NCCL synchronisation dominates. In that case serve one candidate
+    # per GPU instead and generate the answers of several candidates concurrently.
+    def fits_single_gpu(model_path: str) -> bool:
+        weights_size = sum(
+            entry.stat().st_size
+            for entry in os.scandir(model_path)
+            if entry.name.endswith((".safetensors", ".bin"))
+        )
+        return weights_size < gpus[0][1] * 0.8
+
+    devices = visible.split(",") if visible else [str(i) for i in range(gpu_count)]
+    # A local judge would contend with the candidates for the GPUs, keep a single server
+    if (
+        gpu_count > 1
+        and overlap_judging
+        and models_list
+        and fits_single_gpu(f"{models_folder}/{models_list[0]}")
+    ):
+        gpu_slots = devices
+    else:
+        gpu_slots = [",".join(devices) if devices else None]
+    print(f"Serving candidate models on GPU slots: {gpu_slots}")
+    # Each slot generates answers concurrently, split the automatic worker budget between
+    # them rather than giving every slot all the CPUs
+    if auto_max_workers:
+        max_workers = max(1, max_workers // len(gpu_slots))
+        judge_max_workers = max(1, judge_max_workers // len(gpu_slots))
+    free_gpu_slots = queue.Queue()
+    for gpu_slot in gpu_slots:
+        free_gpu_slots.put(gpu_slot)
+
+    def generate_answers(model_name):
+        model_path = f"{models_folder}/{model_name}"
+        gpu_slot = free_gpu_slots.get()
+        slot_gpu_count = len(gpu_slot.split(",")) if gpu_slot else 0
+        try:
+            print(f"Serving candidate model: {model_name}")
+            vllm_process, vllm_server = launch_vllm(
+                model_path, slot_gpu_count, visible_devices=gpu_slot
+            )
+            # The server must be stopped even when generating the answers fails, otherwise
+            # it keeps holding the GPUs of the slot handed to the next model
+            try:
+                # model ID is the model_path value in vLLM. Several models may be judged at
+                # the same time, so each one keeps its answers and judgments in its own
+                # directory.
+                evaluator = MTBenchEvaluator(
+                    model_name=model_path,
+                    judge_model_name=judge_model_name,
+                    output_dir=os.path.join("/tmp/eval_output", model_name),
+                    merge_system_user_message=merge_system_user_message,
+                )
+
+                evaluator.gen_answers(
+                    server_url=vllm_server,
+                    serving_gpus=slot_gpu_count,
+                    max_workers=max_workers,
+                    http_client=judge_http_client,
+                )
+            finally:
+                shutdown_vllm(
+                    vllm_process, gpu_slot, concurrent_servers=len(gpu_slots) > 1
+                )
+        finally:
+            free_gpu_slots.put(gpu_slot)
+
+        judge_future = judge_executor.submit(judge_model, evaluator, model_path)
+        if not overlap_judging:
+            judge_future.result()
+        return judge_future
+
+    with (
+        ThreadPoolExecutor(max_workers=len(gpu_slots)) as judge_executor,
+        ThreadPoolExecutor(max_workers=len(gpu_slots)) as gen_executor,
+    ):
+        gen_futures = [
+            gen_executor.submit(generate_answers, model_name)
+            for model_name in models_list
+        ]
+        done, _ = wait(gen_futures, return_when=FIRST_EXCEPTION)
+        # A failed model fails the whole run, do not serve the models still queued
+        failed = next((future for future in done if future.exception()), None)
+        if failed is not None:
+            for future in gen_futures:
+                future.cancel()
+            raise failed.exception()
+        judge_futures = [future.result() for future in gen_futures]
+
+    # Stream the reports into the JSON array one model at a time, the qa_pairs of every
+    # model are large and never need to be held in memory together
+    with open(output_path, "wb") as f:
+        f.write(b"[\n")
+        for i, judge_future in enumerate(judge_futures):
+            mt_bench_data = judge_future.result()
+            scores[mt_bench_data["model"]] = mt_bench_data["overall_score"]
+            if i:
+                f.write(b",\n")
+            f.write(json_dumps(mt_bench_data))
+            # Release the finished future so its report can be garbage collected
+            judge_futures[i] = None
+        f.write(b"\n]\n")
 
     outputs = NamedTuple("outputs", best_model=str, best_score=float)
     best_model = max(scores, key=scores.get)
     best_score = scores[best_model]
     if best_score_file:
-        with open(best_score_file, "w", encoding="utf-8") as f:
-            json.dump({"best_model": best_model, "best_score": best_score}, f, indent=4)
-
-    # Rename the best model directory to "candidate_model" for the next step
-    # So we know which model to use for the final evaluation
-    if os.path.exists(os.path.join(models_folder, "candidate_model")):
-        print("candidate_model already exists. Skipping renaming")
+        with open(best_score_file, "wb") as f:
+            f.write(json_dumps({"best_model": best_model, "best_score": best_score}))
+
+    # Link the best model directory as "candidate_model" for the next step
+    # So we know which model to use for the final evaluation. A relative symlink keeps the
+    # original checkpoint path valid and does not move any data.
+    candidate_model_path = os.path.join(models_folder, "candidate_model")
+    if os.path.lexists(candidate_model_path):
+        print("candidate_model already exists. Skipping linking")
     else:
-        os.rename(
-            os.path.join(models_folder, best_model),
-            os.path.join(models_folder, "candidate_model"),
-        )
+        os.symlink(os.path.basename(best_model), candidate_model_path)
 
     return outputs(best_model=best_model, best_score=best_score)
@@ -1,14 +1,22 @@
 # type: ignore
 # pylint: disable=no-value-for-parameter,import-outside-toplevel,import-error,no-member
+import functools
+import importlib
+import json
 import os
+import re
+import tempfile
 import typing
-from typing import List, Literal, Optional
+from types import MappingProxyType, SimpleNamespace
+from typing import Dict, FrozenSet, Literal, Optional
 
 import click
+import yaml
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+from jinja2.exceptions import TemplateNotFound, TemplateSyntaxError
 from kfp import compiler, dsl
 from kfp.kubernetes import (
     CreatePVC,
-    DeletePVC,
     mount_pvc,
     use_config_map_as_env,
     use_config_map_as_volume,
@@ -27,6 +35,10 @@ STANDALONE_TEMPLATE_FILE_NAME = "standalone.tpl"
 GENERATED_STANDALONE_FILE_NAME = "standalone.py"
 DEFAULT_REPO_URL = "https://github.com/instructlab/taxonomy.git"
 
+# The compiled bytecode of the standalone template is cached there, so later runs skip
+# parsing and compiling the template
+STANDALONE_TEMPLATE_CACHE_DIR = os.path.join(tempfile.gettempdir(), "ilab_jinja_cache")
+
 # Model Serving SSL connection
 SDG_CA_CERT_CM_KEY = "ca.crt"
 SDG_CA_CERT_ENV_VAR_NAME = "SDG_CA_CERT_PATH"
@@ -36,56 +48,122 @@ JUDGE_CA_CERT_CM_KEY = "ca.crt"
 JUDGE_CA_CERT_ENV_VAR_NAME = "JUDGE_CA_CERT_PATH"
 JUDGE_CA_CERT_PATH = "/tmp/cert"
 
+# KFP placeholders in the compiled executor args: input parameters, output artifact paths
+# and the whole executor input ('{{$}}')
+TEMPLATE_MARKER_PATTERN = re.compile(
+    r"\{\{\$(?:\.inputs\.parameters\['(?P<parameter>[^']+)'\]"
+    r"|(?P<artifact>\.outputs\.artifacts\['[^']+'\]\.path))?\}\}"
+)
+# Matches the ".path" attribute of the component artifacts but not "os.path"
+ARTIFACT_PATH_PATTERN = re.compile(r"(?<!os)\.path")
+# Container fields of an executor needed to generate the standalone script
+EXECUTOR_CONTAINER_FIELDS = frozenset(("command", "args", "image"))
+
+# KFP specific annotations and imports rewritten to turn a component into a plain function
+DSL_REPLACEMENTS = {
+    "dsl.Input[dsl.Dataset]": "str",
+    "dsl.Input[dsl.Model]": "str",
+    "dsl.Input[dsl.Artifact]": "str",
+    "dsl.Output[dsl.Dataset]": "str",
+    "dsl.Output[dsl.Model]": "str",
+    "Output[Artifact]": "str",
+    "Input[Dataset]": "str",
+    "import kfp": "",
+    "from kfp import dsl": "",
+    "from kfp.dsl import *": "",
+}
+# Longest keys first, so that a key is never shadowed by one of its substrings
+DSL_REPLACEMENTS_PATTERN = re.compile(
+    "|".join(map(re.escape, sorted(DSL_REPLACEMENTS, key=len, reverse=True)))
+)
+
+# The list of executor names to extract details from to generate the standalone script
+STANDALONE_EXECUTORS = MappingProxyType(
+    {
+        "exec-data-processing-op": 'data_processing_op(max_seq_len={MAX_SEQ_LEN}, max_batch_len={MAX_BATCH_LEN}, sdg_path="{DATA_PVC_SDG_PATH}", model_path="{DATA_PVC_MODEL_PATH}", skills_path="{PREPROCESSED_DATA_SKILLS_PATH}", knowledge_path="{PREPROCESSED_DATA_KNOWLEDGE_PATH}")',
+        "exec-sdg-op": 'sdg_op(num_instructions_to_generate={num_instructions_to_generate}, pipeline="{sdg_pipeline}", repo_branch="{exec_git_clone_op_repo_branch or ""}", repo_pr={exec_git_clone_op_repo_pr or 0}, taxonomy_path="{TAXONOMY_DATA_PATH}", sdg_path="{DATA_PVC_SDG_PATH}", sdg_sampling_size={sdg_sampling_size})',
+        "exec-git-clone-op": {},
+        "exec-run-mt-bench-op": 'run_mt_bench_op(best_score_file="{MT_BENCH_SCORES_PATH}",output_path="{MT_BENCH_OUTPUT_PATH}",models_folder="{CANDIDATE_MODEL_PATH_PREFIX}", max_workers="{MAX_WORKERS}", merge_system_user_message={MERGE_SYSTEM_USER_MESSAGE})',
+        "exec-run-final-eval-op": 'run_final_eval_op(mmlu_branch_output="{MMLU_BRANCH_SCORES_PATH}", mt_bench_branch_output="{MT_BENCH_BRANCH_SCORES_PATH}", candidate_model="{CANDIDATE_MODEL_PATH}", taxonomy_path="{TAXONOMY_PATH}", sdg_path="{DATA_PVC_SDG_PATH}", base_branch="", candidate_branch="", base_model_dir="{DATA_PVC_MODEL_PATH}", max_workers="{MAX_WORKERS}", merge_system_user_message={MERGE_SYSTEM_USER_MESSAGE}, few_shots={FEW_SHOTS}, batch_size="{BATCH_SIZE}")',
+    }
+)
+
+# Components of the stages which can be mocked, per module. A mocked stage imports them
+# from the "faked" subpackage of the same module.
+STAGE_OPS = {
+    "sdg": {
+        "sdg": [
+            "git_clone_op",
+            "sdg_op",
+            "sdg_to_artifact_op",
+            "taxonomy_to_artifact_op",
+        ],
+    },
+    "train": {
+        "training": [
+            "data_processing_op",
+            "processed_data_to_artifacts_op",
+            "pytorchjob_manifest_op",
+        ],
+        "utils": [
+            "model_to_pvc_op",
+            "pvc_to_outputs_op",
+        ],
+    },
+}
+
+
+def load_stage_ops(mock: FrozenSet[Literal[MOCKED_STAGES]]) -> SimpleNamespace:
+    """Imports the components of every stage, the faked ones for the mocked stages."""
+    ops = {}
+    for stage, modules in STAGE_OPS.items():
+        for module_name, names in modules.items():
+            if stage in mock:
+                module_name = f"{module_name}.faked"
+            module = importlib.import_module(module_name)
+            ops.update((name, getattr(module, name)) for name in names)
+    return SimpleNamespace(**ops)
+
+
+def mount_pvcs(task: dsl.PipelineTask, mounts: Dict[str, dsl.PipelineTask]):
+    """Mounts the PVCs created by the given CreatePVC tasks, keyed by mount path."""
+    for mount_path, pvc_task in mounts.items():
+        mount_pvc(task=task, pvc_name=pvc_task.output, mount_path=mount_path)
+
+
+@functools.cache
+def standalone_template_env() -> Environment:
+    """Returns the Jinja environment of the standalone template, created on first use.
+
+    The environment keeps the compiled template and reloads it when the file changes. The
+    bytecode cache is skipped when its directory cannot be created.
+    """
+    try:
+        os.makedirs(STANDALONE_TEMPLATE_CACHE_DIR, mode=0o700, exist_ok=True)
+        bytecode_cache = FileSystemBytecodeCache(
+            directory=STANDALONE_TEMPLATE_CACHE_DIR
+        )
+    except OSError:
+        bytecode_cache = None
+    return Environment(
+        loader=FileSystemLoader("standalone"), bytecode_cache=bytecode_cache
+    )
+
 
-def ilab_pipeline_wrapper(mock: List[Literal[MOCKED_STAGES]]):
+@functools.cache
+def ilab_pipeline_wrapper(mock: FrozenSet[Literal[MOCKED_STAGES]]):
     """Wrapper for KFP pipeline, which allows for mocking individual stages."""
 
-    # Imports for SDG stage
-    if mock is not None and "sdg" in mock:
-        from sdg.faked import (
-            git_clone_op,
-            sdg_op,
-            sdg_to_artifact_op,
-            taxonomy_to_artifact_op,
-        )
-    else:
-        from sdg import (
-            git_clone_op,
-            sdg_op,
-            sdg_to_artifact_op,
-            taxonomy_to_artifact_op,
-        )
-
-    # Imports for Training stage
-    if mock is not None and "train" in mock:
-        from training.faked import (
-            data_processing_op,
-            knowledge_processed_data_to_artifact_op,
-            pytorchjob_manifest_op,
-            skills_processed_data_to_artifact_op,
-        )
-        from utils.faked import (
-            model_to_pvc_op,
-            pvc_to_model_op,
-            pvc_to_mt_bench_op,
-        )
-    else:
-        from training import (
-            data_processing_op,
-            knowledge_processed_data_to_artifact_op,
-            pytorchjob_manifest_op,
-            skills_processed_data_to_artifact_op,
-        )
-        from utils import (
-            model_to_pvc_op,
-            pvc_to_model_op,
-            pvc_to_mt_bench_op,
-        )
+    # Imports for SDG and Training stages
+    ops = load_stage_ops(mock)
 
     # Imports for evaluation
     from eval.final import run_final_eval_op
     from eval.mt_bench import run_mt_bench_op
 
+    # Imports for cleanup
+    from utils import delete_pvcs_op
+
     @dsl.pipeline(
         display_name="InstructLab",
         name="instructlab",
@@ -172,19 +250,15 @@ def ilab_pipeline_wrapper(mock: List[Literal[MOCKED_STAGES]]):
             size="10Gi",
             storage_class_name=k8s_storage_class_name,
         )
-        git_clone_task = git_clone_op(
+        git_clone_task = ops.git_clone_op(
             repo_branch=sdg_repo_branch,
             repo_pr=sdg_repo_pr if sdg_repo_pr and sdg_repo_pr > 0 else None,
             repo_url=sdg_repo_url,
         )
-        mount_pvc(
-            task=git_clone_task,
-            pvc_name=sdg_input_pvc_task.output,
-            mount_path="/data",
-        )
+        mount_pvcs(git_clone_task, {"/data": sdg_input_pvc_task})
         git_clone_task.set_caching_options(False)
 
-        sdg_task = sdg_op(
+        sdg_task = ops.sdg_op(
             num_instructions_to_generate=sdg_scale_factor,
             pipeline=sdg_pipeline,
             repo_branch=sdg_repo_branch,
@@ -205,28 +279,19 @@ def ilab_pipeline_wrapper(mock: List[Literal[MOCKED_STAGES]]):
         )
 
         sdg_task.after(git_clone_task)
-        mount_pvc(
-            task=sdg_task,
-            pvc_name=sdg_input_pvc_task.output,
-            mount_path="/data",
-        )
+        mount_pvcs(sdg_task, {"/data": sdg_input_pvc_task})
         sdg_task.set_caching_options(False)
 
         # Upload "sdg" and "taxonomy" artifacts to S3 without blocking the rest of the workflow
-        taxonomy_to_artifact_task = taxonomy_to_artifact_op()
-        taxonomy_to_artifact_task.after(git_clone_task, sdg_task)
-        mount_pvc(
-            task=taxonomy_to_artifact_task,
-            pvc_name=sdg_input_pvc_task.output,
-            mount_path="/data",
-        )
-        sdg_to_artifact_task = sdg_to_artifact_op()
-        sdg_to_artifact_task.after(git_clone_task, sdg_task)
-        mount_pvc(
-            task=sdg_to_artifact_task,
-            pvc_name=sdg_input_pvc_task.output,
-            mount_path="/data",
-        )
+        # SDG only reads the taxonomy, so it is uploaded while the data is being generated
+        taxonomy_to_artifact_task = ops.taxonomy_to_artifact_op()
+        taxonomy_to_artifact_task.after(git_clone_task)
+        taxonomy_to_artifact_task.set_retry(num_retries=2)
+        mount_pvcs(taxonomy_to_artifact_task, {"/data": sdg_input_pvc_task})
+        sdg_to_artifact_task = ops.sdg_to_artifact_op()
+        sdg_to_artifact_task.after(sdg_task)
+        sdg_to_artifact_task.set_retry(num_retries=2)
+        mount_pvcs(sdg_to_artifact_task, {"/data": sdg_input_pvc_task})
 
         # uncomment if updating image with same tag
         # set_image_pull_policy(sdg_task, "Always")
@@ -243,47 +308,29 @@ def ilab_pipeline_wrapper(mock: List[Literal[MOCKED_STAGES]]):
             storage_class_name=k8s_storage_class_name,
         )
 
-        model_to_pvc_task = model_to_pvc_op(model=model_source_s3_task.output)
+        # The base model only exists in object storage, copy it once to the shared PVC. Every
+        # later task mounts the PVC directly instead of passing the model as an artifact.
+        model_to_pvc_task = ops.model_to_pvc_op(model=model_source_s3_task.output)
+        # The importer above is cached, but the model PVC is created for every run, so a
+        # cache hit here would leave the new PVC empty
         model_to_pvc_task.set_caching_options(False)
-        mount_pvc(
-            task=model_to_pvc_task, pvc_name=model_pvc_task.output, mount_path="/model"
-        )
+        mount_pvcs(model_to_pvc_task, {"/model": model_pvc_task})
 
         # Data processing
-        data_processing_task = data_processing_op(max_batch_len=sdg_max_batch_len)
-        mount_pvc(
-            task=data_processing_task,
-            pvc_name=model_pvc_task.output,
-            mount_path="/model",
-        )
-        mount_pvc(
-            task=data_processing_task,
-            pvc_name=sdg_input_pvc_task.output,
-            mount_path="/data",
+        data_processing_task = ops.data_processing_op(max_batch_len=sdg_max_batch_len)
+        mount_pvcs(
+            data_processing_task,
+            {"/model": model_pvc_task, "/data": sdg_input_pvc_task},
         )
         data_processing_task.after(model_to_pvc_task, sdg_task)
         data_processing_task.set_caching_options(False)
         data_processing_task.set_env_variable("XDG_CACHE_HOME", "/tmp")
 
         # Upload "skills_processed_data" and "knowledge_processed_data" artifacts to S3 without blocking the rest of the workflow
-        skills_processed_data_to_artifact_task = skills_processed_data_to_artifact_op()
-        skills_processed_data_to_artifact_task.after(data_processing_task)
-        mount_pvc(
-            task=skills_processed_data_to_artifact_task,
-            pvc_name=sdg_input_pvc_task.output,
-            mount_path="/data",
-        )
-        skills_processed_data_to_artifact_task.set_caching_options(False)
-        knowledge_processed_data_to_artifact_task = (
-            knowledge_processed_data_to_artifact_op()
-        )
-        knowledge_processed_data_to_artifact_task.after(data_processing_task)
-        mount_pvc(
-            task=knowledge_processed_data_to_artifact_task,
-            pvc_name=sdg_input_pvc_task.output,
-            mount_path="/data",
-        )
-        knowledge_processed_data_to_artifact_task.set_caching_options(False)
+        processed_data_to_artifacts_task = ops.processed_data_to_artifacts_op()
+        processed_data_to_artifacts_task.after(data_processing_task)
+        mount_pvcs(processed_data_to_artifacts_task, {"/data": sdg_input_pvc_task})
+        processed_data_to_artifacts_task.set_caching_options(False)
 
         output_pvc_task = CreatePVC(
             pvc_name_suffix="-output",
@@ -292,54 +339,51 @@ def ilab_pipeline_wrapper(mock: List[Literal[MOCKED_STAGES]]):
             storage_class_name=k8s_storage_class_name,
         )
 
-        # Training 1
-        # Using pvc_create_task.output as PyTorchJob name since dsl.PIPELINE_* global variables do not template/work in KFP v2
-        # https://github.com/kubeflow/pipelines/issues/10453
-        training_phase_1 = pytorchjob_manifest_op(
+        # Arguments shared by both training phases
+        training_args = dict(
             model_pvc_name=model_pvc_task.output,
             input_pvc_name=sdg_input_pvc_task.output,
             name_suffix=sdg_input_pvc_task.output,
             output_pvc_name=output_pvc_task.output,
-            phase_num=1,
             nproc_per_node=train_nproc_per_node,
             nnodes=train_nnodes,
+            save_samples=train_save_samples,
+            max_batch_len=train_max_batch_len,
+            seed=train_seed,
+        )
+
+        # Training 1
+        # Using pvc_create_task.output as PyTorchJob name since dsl.PIPELINE_* global variables do not template/work in KFP v2
+        # https://github.com/kubeflow/pipelines/issues/10453
+        training_phase_1 = ops.pytorchjob_manifest_op(
+            **training_args,
+            phase_num=1,
             num_epochs=train_num_epochs_phase_1,
             effective_batch_size=train_effective_batch_size_phase_1,
             learning_rate=train_learning_rate_phase_1,
             num_warmup_steps=train_num_warmup_steps_phase_1,
-            save_samples=train_save_samples,
-            max_batch_len=train_max_batch_len,
-            seed=train_seed,
         )
         training_phase_1.after(data_processing_task, model_to_pvc_task)
         training_phase_1.set_caching_options(False)
 
         #### Train 2
-        training_phase_2 = pytorchjob_manifest_op(
-            model_pvc_name=model_pvc_task.output,
-            input_pvc_name=sdg_input_pvc_task.output,
-            name_suffix=sdg_input_pvc_task.output,
-            output_pvc_name=output_pvc_task.output,
+        # Phase 2 starts from the newest phase 1 checkpoint found on the output PVC, so this
+        # is a true data dependency. The model, data and output PVCs are created upfront and
+        # every upload task hangs off the DAG, which leaves the two phases as the only
+        # serialized part of the critical path.
+        training_phase_2 = ops.pytorchjob_manifest_op(
+            **training_args,
             phase_num=2,
-            nproc_per_node=train_nproc_per_node,
-            nnodes=train_nnodes,
             num_epochs=train_num_epochs_phase_2,
             effective_batch_size=train_effective_batch_size_phase_2,
             learning_rate=train_learning_rate_phase_2,
             num_warmup_steps=train_num_warmup_steps_phase_2,
-            save_samples=train_save_samples,
-            max_batch_len=train_max_batch_len,
-            seed=train_seed,
         )
 
         training_phase_2.set_caching_options(False)
         training_phase_2.after(training_phase_1)
 
-        mount_pvc(
-            task=training_phase_2,
-            pvc_name=output_pvc_task.output,
-            mount_path="/output",
-        )
+        mount_pvcs(training_phase_2, {"/output": output_pvc_task})
 
         # MT_Bench Evaluation of models
 
@@ -348,14 +392,12 @@ def ilab_pipeline_wrapper(mock: List[Literal[MOCKED_STAGES]]):
             max_workers=mt_bench_max_workers,
             merge_system_user_message=mt_bench_merge_system_user_message,
         )
-        mount_pvc(
-            task=run_mt_bench_task,
-            pvc_name=output_pvc_task.output,
-            mount_path="/output",
-        )
+        mount_pvcs(run_mt_bench_task, {"/output": output_pvc_task})
         run_mt_bench_task.set_env_variable("HOME", "/tmp")
         run_mt_bench_task.set_env_variable("HF_HOME", "/tmp")
         run_mt_bench_task.set_accelerator_type("nvidia.com/gpu")
+        # run_mt_bench_op serves the candidate checkpoints concurrently, one per GPU when they
+        # fit on a single GPU, so raising this limit scales the stage without a ParallelFor
         run_mt_bench_task.set_accelerator_limit(1)
         run_mt_bench_task.set_caching_options(False)
         run_mt_bench_task.after(training_phase_2)
@@ -388,18 +430,13 @@ def ilab_pipeline_wrapper(mock: List[Literal[MOCKED_STAGES]]):
             few_shots=final_eval_few_shots,
             batch_size=final_eval_batch_size,
         )
-        mount_pvc(
-            task=final_eval_task, pvc_name=output_pvc_task.output, mount_path="/output"
-        )
-        mount_pvc(
-            task=final_eval_task,
-            pvc_name=sdg_input_pvc_task.output,
-            mount_path="/input",
-        )
-        mount_pvc(
-            task=final_eval_task,
-            pvc_name=model_pvc_task.output,
-            mount_path="/model",
+        mount_pvcs(
+            final_eval_task,
+            {
+                "/output": output_pvc_task,
+                "/input": sdg_input_pvc_task,
+                "/model": model_pvc_task,
+            },
         )
 
         use_config_map_as_env(
@@ -429,46 +466,30 @@ def ilab_pipeline_wrapper(mock: List[Literal[MOCKED_STAGES]]):
         final_eval_task.set_accelerator_limit(1)
         final_eval_task.set_caching_options(False)
 
-        output_model_task = pvc_to_model_op(
-            pvc_path="/output/phase_2/model/hf_format/candidate_model",
-        )
-        output_model_task.after(run_mt_bench_task)
-        output_model_task.set_caching_options(False)
-        mount_pvc(
-            task=output_model_task,
-            pvc_name=output_pvc_task.output,
-            mount_path="/output",
-        )
-
-        output_mt_bench_task = pvc_to_mt_bench_op(
-            pvc_path="/output/mt_bench_data.json",
+        output_task = ops.pvc_to_outputs_op(
+            model_pvc_path="/output/phase_2/model/hf_format/candidate_model",
+            mt_bench_pvc_path="/output/mt_bench_data.json",
         )
-        output_mt_bench_task.after(run_mt_bench_task)
-        output_mt_bench_task.set_caching_options(False)
+        output_task.after(run_mt_bench_task)
+        output_task.set_caching_options(False)
+        mount_pvcs(output_task, {"/output": output_pvc_task})
 
-        mount_pvc(
-            task=output_mt_bench_task,
-            pvc_name=output_pvc_task.output,
-            mount_path="/output",
-        )
-
-        output_pvc_delete_task = DeletePVC(pvc_name=output_pvc_task.output)
-        output_pvc_delete_task.after(
-            output_model_task, output_mt_bench_task, final_eval_task
+        # Delete all the PVCs from a single pod rather than one task per PVC
+        pvc_delete_task = delete_pvcs_op(
+            output_pvc_name=output_pvc_task.output,
+            input_pvc_name=sdg_input_pvc_task.output,
+            model_pvc_name=model_pvc_task.output,
         )
-
-        sdg_pvc_delete_task = DeletePVC(pvc_name=sdg_input_pvc_task.output)
-        sdg_pvc_delete_task.after(final_eval_task)
-
-        model_pvc_delete_task = DeletePVC(pvc_name=model_pvc_task.output)
-        model_pvc_delete_task.after(final_eval_task)
+        pvc_delete_task.after(output_task, final_eval_task)
+        pvc_delete_task.set_caching_options(False)
 
         return
 
     return pipeline
 
 
-def import_base_model_pipeline_wrapper(mock: List[Literal[MOCKED_STAGES]]):
+@functools.cache
+def import_base_model_pipeline_wrapper(mock: FrozenSet[Literal[MOCKED_STAGES]]):
     from utils import ilab_importer_op
 
     @dsl.pipeline(
@@ -526,6 +547,8 @@ def cli(ctx: click.Context, mock):
 
 
 def generate_pipeline(mock):
+    # The pipeline wrappers are cached per set of mocked stages
+    mock = frozenset(mock or ())
     ilab_pipeline = ilab_pipeline_wrapper(mock)
     import_base_model_pipeline = import_base_model_pipeline_wrapper(mock)
 
@@ -534,9 +557,9 @@ def generate_pipeline(mock):
         (import_base_model_pipeline, IMPORTER_PIPELINE_FILE_NAME),
     ]
 
-    with click.progressbar(pipelines, label="Generating pipeline") as bar:
-        for pipeline_func, pipeline_file in bar:
-            compiler.Compiler().compile(pipeline_func, pipeline_file)
+    for pipeline_func, pipeline_file in pipelines:
+        click.echo(f"Generating {pipeline_file}...")
+        compiler.Compiler().compile(pipeline_func, pipeline_file)
 
 
 @cli.command(name="run")
@@ -586,7 +609,7 @@ def run(mock, experiment, run_name, param):
 
     arguments = {**dev_arguments, **parsed_params}
     client.create_run_from_pipeline_func(
-        pipeline_func=ilab_pipeline_wrapper(mock),
+        pipeline_func=ilab_pipeline_wrapper(frozenset(mock)),
         experiment_name=experiment,
         run_name=run_name,
         arguments=arguments,
@@ -603,12 +626,6 @@ def gen_standalone():
 
     Example usage: ''' $ python pipeline.py gen-standalone '''
     """
-    from os import chmod, path
-
-    import yaml
-    from jinja2 import Template
-    from jinja2.exceptions import TemplateSyntaxError
-
     click.echo("Generating pipeline YAML file...")
     try:
         generate_pipeline(mock=None)
@@ -616,29 +633,23 @@ def gen_standalone():
         click.echo(f"Error: {e}", err=True)
         raise click.exceptions.Exit(1)
 
-    # Load the YAML pipeline file which contains multiple documents
+    # Load the YAML pipeline file which contains multiple documents, with the libyaml
+    # backed loader when PyYAML was built with it. The documents are parsed lazily and
+    # parsing stops at the pipeline spec, the platform spec which follows it is not needed.
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
     with open(PIPELINE_FILE_NAME, "r", encoding="utf-8") as file:
         try:
-            documents = list(yaml.safe_load_all(file))
+            executor_index = index_executors(yaml.load_all(file, Loader=loader))
         except ValueError as e:
             click.echo(f"Error: {e}", err=True)
             raise click.exceptions.Exit(1)
 
-    # The list of executor names to extract details from to generate the standalone script
-    executors = {
-        "exec-data-processing-op": 'data_processing_op(max_seq_len={MAX_SEQ_LEN}, max_batch_len={MAX_BATCH_LEN}, sdg_path="{DATA_PVC_SDG_PATH}", model_path="{DATA_PVC_MODEL_PATH}", skills_path="{PREPROCESSED_DATA_SKILLS_PATH}", knowledge_path="{PREPROCESSED_DATA_KNOWLEDGE_PATH}")',
-        "exec-sdg-op": 'sdg_op(num_instructions_to_generate={num_instructions_to_generate}, pipeline="{sdg_pipeline}", repo_branch="{exec_git_clone_op_repo_branch or ""}", repo_pr={exec_git_clone_op_repo_pr or 0}, taxonomy_path="{TAXONOMY_DATA_PATH}", sdg_path="{DATA_PVC_SDG_PATH}", sdg_sampling_size={sdg_sampling_size})',
-        "exec-git-clone-op": {},
-        "exec-run-mt-bench-op": 'run_mt_bench_op(best_score_file="{MT_BENCH_SCORES_PATH}",output_path="{MT_BENCH_OUTPUT_PATH}",models_folder="{CANDIDATE_MODEL_PATH_PREFIX}", max_workers="{MAX_WORKERS}", merge_system_user_message={MERGE_SYSTEM_USER_MESSAGE})',
-        "exec-run-final-eval-op": 'run_final_eval_op(mmlu_branch_output="{MMLU_BRANCH_SCORES_PATH}", mt_bench_branch_output="{MT_BENCH_BRANCH_SCORES_PATH}", candidate_model="{CANDIDATE_MODEL_PATH}", taxonomy_path="{TAXONOMY_PATH}", sdg_path="{DATA_PVC_SDG_PATH}", base_branch="", candidate_branch="", base_model_dir="{DATA_PVC_MODEL_PATH}", max_workers="{MAX_WORKERS}", merge_system_user_message={MERGE_SYSTEM_USER_MESSAGE}, few_shots={FEW_SHOTS}, batch_size="{BATCH_SIZE}")',
-    }
-
     details = {}
-    for executor_name, executor_input_param in executors.items():
+    for executor_name, executor_input_param in STANDALONE_EXECUTORS.items():
         try:
             executor_name_camelize = executor_name.replace("-", "_")
             # replace "-" with "_" in executor_name to match the key in the details dictionary
-            executor_details = get_executor_details(documents, executor_name)
+            executor_details = get_executor_details(executor_index, executor_name)
             if executor_details is not None:
                 details[executor_name_camelize + "_image"] = executor_details["image"]
                 details[executor_name_camelize + "_command"] = (
@@ -657,94 +668,95 @@ def gen_standalone():
             click.echo(f"Error: {e}", err=True)
             raise click.exceptions.Exit(1)
 
-    # Open the template file
+    # Load the template, the environment keeps the compiled template and only recompiles
+    # it when the file changes
+    standalone_template_path = os.path.join("standalone", STANDALONE_TEMPLATE_FILE_NAME)
     try:
-        standalone_template_path = path.join(
-            "standalone", STANDALONE_TEMPLATE_FILE_NAME
-        )
-        with open(standalone_template_path, "r", encoding="utf-8") as template_file:
-            template_content = template_file.read()
-    except FileNotFoundError as e:
+        template = standalone_template_env().get_template(STANDALONE_TEMPLATE_FILE_NAME)
+    except TemplateNotFound as e:
         click.echo(
             f"Error: The template file '{standalone_template_path}' was not found.",
             err=True,
         )
         raise click.exceptions.Exit(1) from e
-    except IOError as e:
+    except TemplateSyntaxError as e:
         click.echo(
-            f"Error: An I/O error occurred while reading '{standalone_template_path}': {e}",
+            f"Error: The template file '{standalone_template_path}' contains a syntax error: {e}",
             err=True,
         )
         raise click.exceptions.Exit(1)
-
-    # Prepare the Jinja2 Template
-    try:
-        template = Template(template_content)
-    except TemplateSyntaxError as e:
+    except IOError as e:
         click.echo(
-            f"Error: The template file '{standalone_template_path}' contains a syntax error: {e}",
+            f"Error: An I/O error occurred while reading '{standalone_template_path}': {e}",
             err=True,
         )
         raise click.exceptions.Exit(1)
 
-    # Render the template with dynamic values
-    rendered_code = template.render(details)
-
-    # Write the rendered code to a new Python file
-    standalone_script_path = path.join("standalone", GENERATED_STANDALONE_FILE_NAME)
-    with open(standalone_script_path, "w", encoding="utf-8") as output_file:
-        output_file.write(rendered_code)
+    # Render the template with dynamic values straight into a new Python file
+    standalone_script_path = os.path.join("standalone", GENERATED_STANDALONE_FILE_NAME)
+    with open(standalone_script_path, "wb", buffering=1 << 20) as output_file:
+        template.stream(details).dump(output_file, encoding="utf-8")
     # Make the rendered file executable
-    chmod(standalone_script_path, 0o755)
+    os.chmod(standalone_script_path, 0o755)
 
     click.echo(f"Successfully generated '{standalone_script_path}' script.")
 
 
-def get_executor_details(
-    documents: typing.List[typing.Dict[str, typing.Any]], executor_name: str
-) -> dict | None:
+def index_executors(
+    documents: typing.Iterable[typing.Dict[str, typing.Any]],
+) -> typing.Dict[str, typing.Any]:
     """
-    Extracts the command, args, and image of a given executor container from the provided YAML
-    documents.
+    Indexes the executors of the first YAML document which has a deploymentSpec by name.
 
     Args:
-        documents (List[Dict[str, Any]]): List of YAML documents loaded as dictionaries.
-        executor_name (str): The name of the executor to search for.
+        documents (Iterable[Dict[str, Any]]): YAML documents loaded as dictionaries, only
+            consumed up to the first one which has a deploymentSpec.
 
     Returns:
-        dict: A dictionary containing the 'command', 'args', and 'image' of the executor container
-        if found, otherwise raise en error.
+        dict: A dictionary mapping every executor name to its definition.
     """
     spec = "deploymentSpec"
-    deployment_spec_found = False
     for doc in documents:
         deployment_spec = doc.get(spec)
         if not deployment_spec:
             continue
-        else:
-            deployment_spec_found = True
-        for executors_value in deployment_spec.values():
-            for executor, executor_value in executors_value.items():
-                if executor == executor_name:
-                    container = executor_value.get("container", {})
-                    if not all(
-                        key in container for key in ("command", "args", "image")
-                    ):
-                        raise ValueError(
-                            f"Executor '{executor_name}' does not have the required "
-                            "'command', 'args', or 'image' fields."
-                        )
-                    return {
-                        "command": container["command"],
-                        "args": container["args"],
-                        "image": container["image"],
-                    }
-        print(f"Executor '{executor_name}' not found in the provided {spec} document.")
+        return {
+            executor: executor_value
+            for executors_value in deployment_spec.values()
+            if isinstance(executors_value, dict)
+            for executor, executor_value in executors_value.items()
+        }
+    raise ValueError("The provided documents do not contain a 'deploymentSpec' key.")
+
+
+def get_executor_details(
+    executor_index: typing.Dict[str, typing.Any], executor_name: str
+) -> dict | None:
+    """
+    Extracts the command, args, and image of a given executor container from the executor
+    index.
+
+    Args:
+        executor_index (Dict[str, Any]): Executors indexed by name, see index_executors.
+        executor_name (str): The name of the executor to search for.
+
+    Returns:
+        dict: A dictionary containing the 'command', 'args', and 'image' of the executor container
+        if found, otherwise None.
+    """
+    executor_value = executor_index.get(executor_name)
+    if executor_value is None:
+        print(
+            f"Executor '{executor_name}' not found in the provided deploymentSpec document."
+        )
         return None
-    if not deployment_spec_found:
+    container = executor_value.get("container", {})
+    if not EXECUTOR_CONTAINER_FIELDS <= container.keys():
         raise ValueError(
-            "The provided documents do not contain a 'deploymentSpec' key."
+            f"Executor '{executor_name}' does not have the required "
+            "'command', 'args', or 'image' fields."
         )
+    return {field: container[field] for field in EXECUTOR_CONTAINER_FIELDS}
 
 
 def remove_template_markers(
@@ -764,60 +776,32 @@ def remove_template_markers(
         Output: ["{exec_repo_name}", "{exec_model}"]
 
     """
-    import json
-    import re
-
-    pattern = r"\{\{\$\.inputs\.parameters\['([^']+)'\]\}\}"
-    rendered_code = [
-        re.sub(pattern, r"{%s_\1}" % executor_name, element)
-        for element in rendered_code
-    ]
-
-    # TODO: find a better approach
-    # Only useful for git_clone_op at the moment
-    # additionally remove {{$.outputs.artifacts[\'taxonomy\'].path}}
-    pattern = r"\{\{\$\.outputs\.artifacts\['([^']+)'\]\.path\}\}"
-    rendered_code = [
-        re.sub(pattern, r"{TAXONOMY_PATH}", element) for element in rendered_code
-    ]
-
-    # Replace '{{$}}' with input_param
-    pattern = r"\{\{\$\}\}"
-    rendered_code = [
-        re.sub(pattern, json.dumps(executor_input_param), element)
-        for element in rendered_code
-    ]
-
+    executor_input = json.dumps(executor_input_param)
+
+    def replace_marker(match: re.Match) -> str:
+        if match["parameter"]:
+            return "{%s_%s}" % (executor_name, match["parameter"])
+        # TODO: find a better approach
+        # Only useful for git_clone_op at the moment
+        # additionally remove {{$.outputs.artifacts[\'taxonomy\'].path}}
+        if match["artifact"]:
+            return "{TAXONOMY_PATH}"
+        # Replace '{{$}}' with input_param
+        return executor_input
+
+    # Rewrite the list in place, the args come straight from the parsed YAML documents
+    for i, element in enumerate(rendered_code):
+        rendered_code[i] = TEMPLATE_MARKER_PATTERN.sub(replace_marker, element)
     return rendered_code
 
 
 def change_dsl_function_to_normal_function(rendered_code: list):
-    replacements = {
-        "dsl.Input[dsl.Dataset]": "str",
-        "dsl.Input[dsl.Model]": "str",
-        "dsl.Input[dsl.Artifact]": "str",
-        "dsl.Output[dsl.Dataset]": "str",
-        "dsl.Output[dsl.Model]": "str",
-        "Output[Artifact]": "str",
-        "Input[Dataset]": "str",
-        "import kfp": "",
-        "from kfp import dsl": "",
-        "from kfp.dsl import *": "",
-    }
-
-    import re
-
-    # Regular expression to match ".path" but not "os.path"
-    path_pattern = re.compile(r"(?<!os)\.path")
-
-    def remove_path_not_os_path(line):
-        return path_pattern.sub("", line)
-
-    rendered_code = [remove_path_not_os_path(line) for line in rendered_code]
-
-    for old, new in replacements.items():
-        rendered_code = [line.replace(old, new) for line in rendered_code]
-    return rendered_code[-1].strip()
+    # Only the last element of the command holds the function source
+    function_source = ARTIFACT_PATH_PATTERN.sub("", rendered_code[-1])
+    function_source = DSL_REPLACEMENTS_PATTERN.sub(
+        lambda match: DSL_REPLACEMENTS[match[0]], function_source
+    )
+    return function_source.strip()
 
 
 if __name__ == "__main__":
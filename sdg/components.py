@@ -18,7 +18,12 @@ def git_clone_op(
         "registry.access.redhat.com/ubi9/toolbox",
         ["/bin/sh", "-c"],
         [
-            f"git clone {repo_url} {taxonomy_path} && cd {taxonomy_path} && "
+            # A branch or PR is diffed against main, which needs the commit history: only skip
+            # the file contents of the commits which are not checked out. Otherwise the whole
+            # taxonomy is read from the tip of the default branch.
+            f'if [ -n "{repo_branch}" ] || {{ [ -n "{repo_pr}" ] && [ {repo_pr} -gt 0 ]; }}; then '
+            + "set -- --filter=blob:none; else set -- --depth=1 --single-branch; fi && "
+            + f'git clone "$@" {repo_url} {taxonomy_path} && cd {taxonomy_path} && '
             + f'if [ -n "{repo_branch}" ]; then '
             + f"git fetch origin {repo_branch} && git checkout {repo_branch}; "
             + f'elif [ -n "{repo_pr}" ] && [ {repo_pr} -gt 0 ]; then '
@@ -23,6 +23,7 @@ TODO:
 """
 
 import base64
+import functools
 import json
 import logging
 import os
@@ -312,6 +313,7 @@ if [ "$STRATEGY" == "upload" ]; then
       --gzip \
       --verbose \
       --ignore-failed-read \
+      --dereference \
       --file "$FINAL_DATA_TAR_PATH" {mt_bench_output_path} {mt_bench_scores_path} {mt_bench_branch_scores_path} {mmlu_branch_scores_path} {candidate_model_path}
 fi
 
@@ -1061,6 +1063,33 @@ def run(
         ctx.invoke(upload_trained_model)
 
 
+@functools.cache
+def get_api_client() -> kubernetes.client.ApiClient:
+    """
+    Return the Kubernetes API client shared by every API object of the script.
+
+    Each API object created without a client builds its own connection pool, reusing a single
+    client keeps the connections to the API server (and their TLS sessions) alive across calls.
+
+    Returns:
+        kubernetes.client.ApiClient: The shared Kubernetes API client.
+    """
+    return kubernetes.client.ApiClient()
+
+
+def decode_base64(data: str) -> str:
+    """
+    Decode a base64 encoded Kubernetes Secret value.
+
+    Args:
+        data (str): The base64 encoded value.
+
+    Returns:
+        str: The decoded value.
+    """
+    return base64.b64decode(data).decode("utf-8")
+
+
 def get_security_context() -> kubernetes.client.V1SecurityContext:
     """
     Get the security context.
@@ -1132,6 +1161,7 @@ def sdg_op(
     sdg_path: str = "/data/sdg",
     sdg_sampling_size: float = 1.0,
 ):
+    import os
     from os import getenv, path
 
     import instructlab.sdg
@@ -1142,10 +1172,14 @@ def sdg_op(
     model = getenv("model")
     endpoint = getenv("endpoint")
 
-    if sdg_ca_cert := getenv("SDG_CA_CERT_PATH"):
+    sdg_ca_cert_path = getenv("SDG_CA_CERT_PATH")
+    use_tls = os.path.exists(sdg_ca_cert_path) and (
+        os.path.getsize(sdg_ca_cert_path) > 0
+    )
+    if use_tls:
         import httpx
 
-        custom_http_client = httpx.Client(verify=sdg_ca_cert)
+        custom_http_client = httpx.Client(verify=sdg_ca_cert_path)
         client = openai.OpenAI(
             base_url=endpoint, api_key=api_key, http_client=custom_http_client
         )
@@ -1658,42 +1692,77 @@ def run_mt_bench_op(
     best_score_file: Optional[str] = None,
 ) -> NamedTuple("outputs", best_model=str, best_score=float):
     import json
+    import multiprocessing
     import os
+    import queue
+    import ssl
     import subprocess
+    import sys
+    import time
+    from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+    from urllib.parse import urlparse
 
-    import torch
+    import httpx
+    import requests
     from instructlab.eval.mt_bench import MTBenchEvaluator
+    from instructlab.model.backends.common import free_tcp_ipv4_port
+    from instructlab.model.backends.vllm import wait_for_stable_vram
 
-    if judge_ca_cert := os.getenv("JUDGE_CA_CERT_PATH"):
-        import httpx
-        import openai
+    # orjson is much faster than the stdlib encoder for the large qa_pairs reports, fall back
+    # to json when it is not available in the image
+    try:
+        import orjson
 
-        # Create a custom HTTP client
-        class CustomHttpClient(httpx.Client):
-            def __init__(self, *args, **kwargs):
-                # Use the custom CA certificate
-                kwargs.setdefault("verify", judge_ca_cert)
-                super().__init__(*args, **kwargs)
+        def json_dumps(data) -> bytes:
+            return orjson.dumps(
+                data, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY
+            )
+    except ImportError:
 
-        # Create a new OpenAI class that uses the custom HTTP client
-        class CustomOpenAI(openai.OpenAI):
-            def __init__(self, *args, **kwargs):
-                custom_client = CustomHttpClient()
-                super().__init__(http_client=custom_client, *args, **kwargs)
+        def json_dumps(data) -> bytes:
+            return json.dumps(data, indent=2).encode("utf-8")
 
-        # Monkey patch the OpenAI class in the openai module, so that the eval lib can use it
-        openai.OpenAI = CustomOpenAI
+    judge_api_key = os.getenv("JUDGE_API_KEY", "")
+    judge_model_name = os.getenv("JUDGE_NAME")
+    judge_endpoint = os.getenv("JUDGE_ENDPOINT")
+    judge_ca_cert_path = os.getenv("JUDGE_CA_CERT_PATH")
+    use_tls = os.path.exists(judge_ca_cert_path) and (
+        os.path.getsize(judge_ca_cert_path) > 0
+    )
+    # Load the CA bundle once, httpx would otherwise parse the certificate file again for
+    # every client it builds
+    judge_ssl_context = (
+        ssl.create_default_context(cafile=judge_ca_cert_path) if use_tls else True
+    )
+    # The judge is a remote endpoint, so its throughput is bound by network round trips
+    # rather than local CPU. Keep a large pool of keep-alive connections and multiplex the
+    # requests over HTTP/2 when the h2 package is available.
+    try:
+        import h2  # noqa: F401
+
+        http2 = True
+    except ImportError:
+        http2 = False
+    judge_http_client = httpx.Client(
+        http2=http2,
+        limits=httpx.Limits(max_connections=256, max_keepalive_connections=64),
+        timeout=httpx.Timeout(600.0, connect=10.0),
+        verify=judge_ssl_context,
+    )
 
     def launch_vllm(
-        model_path: str, gpu_count: int, retries: int = 120, delay: int = 10
+        model_path: str,
+        gpu_count: int,
+        timeout: int = 1200,
+        visible_devices: str = None,
+        max_num_seqs: int = 512,
+        max_num_batched_tokens: int = 16384,
+        block_size: int = 32,
+        enable_prefix_caching: bool = True,
+        gpu_memory_utilization: float = 0.93,
+        quantization: str = None,
+        kv_cache_dtype: str = None,
     ) -> tuple:
-        import subprocess
-        import sys
-        import time
-
-        import requests
-        from instructlab.model.backends.common import free_tcp_ipv4_port
-
         free_port = free_tcp_ipv4_port("127.0.0.1")
         port = str(free_port)
         vllm_server = f"http://127.0.0.1:{port}/v1"
@@ -1706,40 +1775,79 @@ def run_mt_bench_op(
             port,
             "--model",
             model_path,
+            "--max-num-seqs",
+            str(max_num_seqs),
+            "--block-size",
+            str(block_size),
+            "--gpu-memory-utilization",
+            str(gpu_memory_utilization),
+            "--disable-log-requests",
         ]
+        if max_num_batched_tokens:
+            # vLLM refuses to start when the batched tokens budget is lower than the model
+            # context length, so never go below it
+            try:
+                with open(f"{model_path}/config.json", "r", encoding="utf-8") as f:
+                    max_model_len = json.load(f).get("max_position_embeddings", 0)
+            except (OSError, ValueError):
+                max_model_len = 0
+            command += [
+                "--max-num-batched-tokens",
+                str(max(max_num_batched_tokens, max_model_len)),
+            ]
+        # MT-Bench prompts share the same system prompt, so cached prefixes are reused
+        if enable_prefix_caching:
+            command += ["--enable-prefix-caching"]
+        if quantization:
+            command += ["--quantization", quantization]
+        if kv_cache_dtype:
+            command += ["--kv-cache-dtype", kv_cache_dtype]
         if gpu_count > 0:
             command += [
                 "--tensor-parallel-size",
                 str(gpu_count),
             ]
 
-        process = subprocess.Popen(args=command)
+        env = None
+        if visible_devices is not None:
+            env = {**os.environ, "CUDA_VISIBLE_DEVICES": visible_devices}
+
+        process = subprocess.Popen(args=command, env=env)
 
         print(f"Waiting for vLLM server to start at {vllm_server}...")
 
-        for attempt in range(retries):
+        # vLLM typically starts in 15-60 seconds, poll the lightweight health endpoint with
+        # an exponential backoff instead of a fixed 10 seconds delay
+        health_url = f"http://127.0.0.1:{port}/health"
+        deadline = time.monotonic() + timeout
+        delay = 0.5
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(
+                    f"vLLM server exited with code {process.returncode} before becoming ready."
+                )
             try:
-                response = requests.get(f"{vllm_server}/models")
+                response = requests.get(health_url, timeout=1)
                 if response.status_code == 200:
                     print(f"vLLM server is up and running at {vllm_server}.")
                     return process, vllm_server
-            except requests.ConnectionError:
+            except requests.RequestException:
                 pass
 
-            print(
-                f"Server not available yet, retrying in {delay} seconds (Attempt {attempt + 1}/{retries})..."
-            )
+            print(f"Server not available yet, retrying in {delay:.1f} seconds...")
             time.sleep(delay)
+            delay = min(delay * 1.5, 10)
 
         raise RuntimeError(
-            f"Failed to start vLLM server at {vllm_server} after {retries} retries."
+            f"Failed to start vLLM server at {vllm_server} after {timeout} seconds."
         )
 
-    def shutdown_vllm(process: subprocess.Popen, timeout: int = 20):
-        import subprocess
-
-        from instructlab.model.backends.vllm import wait_for_stable_vram
-
+    def shutdown_vllm(
+        process: subprocess.Popen,
+        visible_devices: str = None,
+        concurrent_servers: bool = False,
+        timeout: int = 20,
+    ):
         try:
             process.terminate()
             process.wait(timeout=timeout)
@@ -1761,71 +1869,141 @@ def run_mt_bench_op(
         # vLLM relies on stable VRAM,  residual reclamation activity
         # can lead to crashes on restart. To prevent this add a
         # short delay (typically ~ 10 seconds, max 30) to verify stability.
-        wait_for_stable_vram(30)
+        # When the GPUs of the stopped server are already back to their idle usage the short
+        # delay is enough. Only those GPUs are measured, other servers may use the others.
+        if not concurrent_servers:
+            wait_for_stable_vram(10 if gpus_back_to_idle(visible_devices) else 30)
+            return
+        # wait_for_stable_vram watches every GPU of this process, the servers still running on
+        # the other GPUs would keep it from settling. Wait for the GPUs of the stopped server
+        # to be back to their idle usage instead.
+        deadline = time.monotonic() + 30
+        while not gpus_back_to_idle(visible_devices) and time.monotonic() < deadline:
+            time.sleep(1)
+
+    # gpu_memory returns the (index, uuid, used, total) memory of every GPU as reported by
+    # nvidia-smi
+    def gpu_memory():
+        try:
+            output = subprocess.run(
+                [
+                    "nvidia-smi",
+                    "--query-gpu=index,uuid,memory.used,memory.total",
+                    "--format=csv,noheader,nounits",
+                ],
+                capture_output=True,
+                check=True,
+                text=True,
+            ).stdout
+            return [
+                (index, uuid, int(used), int(total))
+                for index, uuid, used, total in (
+                    (field.strip() for field in line.split(","))
+                    for line in output.splitlines()
+                )
+            ]
+        except (OSError, ValueError, subprocess.CalledProcessError):
+            return None
+
+    # gpus_back_to_idle tells whether the given GPUs, all of them by default, use no more
+    # memory than before any vLLM server was started. CUDA_VISIBLE_DEVICES style device
+    # lists may name the GPUs by index or by UUID.
+    def gpus_back_to_idle(visible_devices: str = None) -> bool:
+        memory = gpu_memory()
+        if memory is None or idle_gpu_memory is None:
+            return False
+        devices = (
+            {device.strip() for device in visible_devices.split(",")}
+            if visible_devices
+            else None
+        )
+        idle_used = {index: used for index, _, used, _ in idle_gpu_memory}
+        measured = [
+            (index, used, total)
+            for index, uuid, used, total in memory
+            if devices is None or index in devices or uuid in devices
+        ]
+        return bool(measured) and all(
+            index in idle_used and used - idle_used[index] <= 0.02 * total
+            for index, used, total in measured
+        )
 
-    gpu_available = torch.cuda.is_available()
-    gpu_name = (
-        torch.cuda.get_device_name(torch.cuda.current_device())
-        if gpu_available
-        else "No GPU available"
-    )
-    gpu_count = torch.cuda.device_count() if gpu_available else 0
+    # Probe the GPUs with nvidia-smi rather than importing torch, the component itself never
+    # runs tensor ops and the import alone costs seconds and hundreds of MB per launch
+    def list_gpus():
+        try:
+            output = subprocess.run(
+                [
+                    "nvidia-smi",
+                    "--query-gpu=name,memory.total",
+                    "--format=csv,noheader,nounits",
+                ],
+                capture_output=True,
+                check=True,
+                text=True,
+            ).stdout
+            return [
+                (name.strip(), int(total) * 1024 * 1024)
+                for name, total in (line.rsplit(",", 1) for line in output.splitlines())
+            ]
+        except (OSError, ValueError, subprocess.CalledProcessError):
+            return []
+
+    gpus = list_gpus()
+    gpu_available = bool(gpus)
+    gpu_name = gpus[0][0] if gpu_available else "No GPU available"
+    visible = os.getenv("CUDA_VISIBLE_DEVICES")
+    if not gpu_available:
+        gpu_count = 0
+    elif visible is not None:
+        gpu_count = len([device for device in visible.split(",") if device.strip()])
+    else:
+        gpu_count = len(gpus)
+    # GPU usage before any vLLM server is started
+    idle_gpu_memory = gpu_memory()
 
     print(f"GPU Available: {gpu_available}, {gpu_name}")
 
-    models_list = os.listdir(models_folder)
-
-    judge_api_key = os.getenv("JUDGE_API_KEY", "")
-    judge_model_name = os.getenv("JUDGE_NAME")
-    judge_endpoint = os.getenv("JUDGE_ENDPOINT")
-
     scores = {}
-    all_mt_bench_data = []
 
     # generate_answers,judgment uses a magic word for its mt_bench evaluator  - 'auto'
     # with 'auto', number of gpus allocated for serving is calculated based on environment
     # https://github.com/instructlab/eval/blob/main/src/instructlab/eval/mt_bench.py#L36
-    if max_workers == "auto":
-        try:
-            usable_cpu_count = len(os.sched_getaffinity(0)) // 2
-        except AttributeError:
-            import multiprocessing
-
-            usable_cpu_count = multiprocessing.cpu_count() // 2
+    judge_max_workers = max_workers
+    auto_max_workers = max_workers == "auto"
+    if auto_max_workers:
+        usable_cpu_count = (
+            len(os.sched_getaffinity(0))
+            if hasattr(os, "sched_getaffinity")
+            else multiprocessing.cpu_count()
+        ) // 2
         max_workers = usable_cpu_count
+        # Judging is I/O bound, so it can use many more workers than answer generation
+        judge_max_workers = min(256, 8 * usable_cpu_count)
+
+    # only keep model directories, ignoring any jsonl files present in the directory
+    with os.scandir(models_folder) as entries:
+        models_list = [
+            entry.name
+            for entry in entries
+            if entry.is_dir(follow_symlinks=False) and not entry.name.endswith(".jsonl")
+        ]
+    # Judging is a remote, network bound call which leaves the local GPU idle, so while
+    # model N is judged we already generate the answers of model N+1. A local judge would
+    # contend with vLLM for the GPU, in which case each model is judged before moving on.
+    judge_host = urlparse(judge_endpoint or "").hostname
+    overlap_judging = judge_host not in (None, "localhost", "127.0.0.1", "::1")
 
-    # modify model_list to ignore any jsonl files present in the directory
-    models_list = [model for model in models_list if not model.endswith(".jsonl")]
-    for model_name in models_list:
-        print(f"Serving candidate model: {model_name}")
-        model_path = f"{models_folder}/{model_name}"
-
-        vllm_process, vllm_server = launch_vllm(model_path, gpu_count)
-
-        # model ID is the model_path value in vLLM
-        evaluator = MTBenchEvaluator(
-            model_name=model_path,
-            judge_model_name=judge_model_name,
-            output_dir="/tmp/eval_output",
-            merge_system_user_message=merge_system_user_message,
-        )
-
-        evaluator.gen_answers(
-            server_url=vllm_server,
-            serving_gpus=gpu_count,
-            max_workers=max_workers,
-        )
-
-        shutdown_vllm(vllm_process)
-
+    def judge_model(evaluator, model_path):
         overall_score, qa_pairs, turn_scores, error_rate = evaluator.judge_answers(
             server_url=judge_endpoint,
             api_key=judge_api_key,
             serving_gpus=gpu_count,
-            max_workers=max_workers,
+            max_workers=judge_max_workers,
+            http_client=judge_http_client,
         )
 
-        mt_bench_data = {
+        return {
             "report_title": "SKILLS EVALUATION REPORT",
             "model": model_path,
             "judge_model": judge_model_name,
@@ -1835,28 +2013,124 @@ def run_mt_bench_op(
             "error_rate": error_rate,
         }
 
-        all_mt_bench_data.append(mt_bench_data)
-        scores[model_path] = overall_score
+    # Tensor parallelism only pays off for models which do not fit on a single GPU, for
+    # smaller models the NCCL synchronisation dominates. In that case serve one candidate
+    # per GPU instead and generate the answers of several candidates concurrently.
+    def fits_single_gpu(model_path: str) -> bool:
+        weights_size = sum(
+            entry.stat().st_size
+            for entry in os.scandir(model_path)
+            if entry.name.endswith((".safetensors", ".bin"))
+        )
+        return weights_size < gpus[0][1] * 0.8
+
+    devices = visible.split(",") if visible else [str(i) for i in range(gpu_count)]
+    # A local judge would contend with the candidates for the GPUs, keep a single server
+    if (
+        gpu_count > 1
+        and overlap_judging
+        and models_list
+        and fits_single_gpu(f"{models_folder}/{models_list[0]}")
+    ):
+        gpu_slots = devices
+    else:
+        gpu_slots = [",".join(devices) if devices else None]
+    print(f"Serving candidate models on GPU slots: {gpu_slots}")
+    # Each slot generates answers concurrently, split the automatic worker budget between
+    # them rather than giving every slot all the CPUs
+    if auto_max_workers:
+        max_workers = max(1, max_workers // len(gpu_slots))
+        judge_max_workers = max(1, judge_max_workers // len(gpu_slots))
+    free_gpu_slots = queue.Queue()
+    for gpu_slot in gpu_slots:
+        free_gpu_slots.put(gpu_slot)
+
+    def generate_answers(model_name):
+        model_path = f"{models_folder}/{model_name}"
+        gpu_slot = free_gpu_slots.get()
+        slot_gpu_count = len(gpu_slot.split(",")) if gpu_slot else 0
+        try:
+            print(f"Serving candidate model: {model_name}")
+            vllm_process, vllm_server = launch_vllm(
+                model_path, slot_gpu_count, visible_devices=gpu_slot
+            )
+            # The server must be stopped even when generating the answers fails, otherwise
+            # it keeps holding the GPUs of the slot handed to the next model
+            try:
+                # model ID is the model_path value in vLLM. Several models may be judged at
+                # the same time, so each one keeps its answers and judgments in its own
+                # directory.
+                evaluator = MTBenchEvaluator(
+                    model_name=model_path,
+                    judge_model_name=judge_model_name,
+                    output_dir=os.path.join("/tmp/eval_output", model_name),
+                    merge_system_user_message=merge_system_user_message,
+                )
+
+                evaluator.gen_answers(
+                    server_url=vllm_server,
+                    serving_gpus=slot_gpu_count,
+                    max_workers=max_workers,
+                    http_client=judge_http_client,
+                )
+            finally:
+                shutdown_vllm(
+                    vllm_process, gpu_slot, concurrent_servers=len(gpu_slots) > 1
+                )
+        finally:
+            free_gpu_slots.put(gpu_slot)
 
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(all_mt_bench_data, f, indent=4)
+        judge_future = judge_executor.submit(judge_model, evaluator, model_path)
+        if not overlap_judging:
+            judge_future.result()
+        return judge_future
+
+    with (
+        ThreadPoolExecutor(max_workers=len(gpu_slots)) as judge_executor,
+        ThreadPoolExecutor(max_workers=len(gpu_slots)) as gen_executor,
+    ):
+        gen_futures = [
+            gen_executor.submit(generate_answers, model_name)
+            for model_name in models_list
+        ]
+        done, _ = wait(gen_futures, return_when=FIRST_EXCEPTION)
+        # A failed model fails the whole run, do not serve the models still queued
+        failed = next((future for future in done if future.exception()), None)
+        if failed is not None:
+            for future in gen_futures:
+                future.cancel()
+            raise failed.exception()
+        judge_futures = [future.result() for future in gen_futures]
+
+    # Stream the reports into the JSON array one model at a time, the qa_pairs of every
+    # model are large and never need to be held in memory together
+    with open(output_path, "wb") as f:
+        f.write(b"[\n")
+        for i, judge_future in enumerate(judge_futures):
+            mt_bench_data = judge_future.result()
+            scores[mt_bench_data["model"]] = mt_bench_data["overall_score"]
+            if i:
+                f.write(b",\n")
+            f.write(json_dumps(mt_bench_data))
+            # Release the finished future so its report can be garbage collected
+            judge_futures[i] = None
+        f.write(b"\n]\n")
 
     outputs = NamedTuple("outputs", best_model=str, best_score=float)
     best_model = max(scores, key=scores.get)
     best_score = scores[best_model]
     if best_score_file:
-        with open(best_score_file, "w", encoding="utf-8") as f:
-            json.dump({"best_model": best_model, "best_score": best_score}, f, indent=4)
-
-    # Rename the best model directory to "candidate_model" for the next step
-    # So we know which model to use for the final evaluation
-    if os.path.exists(os.path.join(models_folder, "candidate_model")):
-        print("candidate_model already exists. Skipping renaming")
+        with open(best_score_file, "wb") as f:
+            f.write(json_dumps({"best_model": best_model, "best_score": best_score}))
+
+    # Link the best model directory as "candidate_model" for the next step
+    # So we know which model to use for the final evaluation. A relative symlink keeps the
+    # original checkpoint path valid and does not move any data.
+    candidate_model_path = os.path.join(models_folder, "candidate_model")
+    if os.path.lexists(candidate_model_path):
+        print("candidate_model already exists. Skipping linking")
     else:
-        os.rename(
-            os.path.join(models_folder, best_model),
-            os.path.join(models_folder, "candidate_model"),
-        )
+        os.symlink(os.path.basename(best_model), candidate_model_path)
 
     return outputs(best_model=best_model, best_score=best_score)
 """
@@ -1881,46 +2155,82 @@ def run_final_eval_op(
     sdg_path: str = "/input/sdg",
 ):
     import json
+    import multiprocessing
     import os
+    import ssl
     import subprocess
-
+    import sys
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from operator import itemgetter
+
+    import httpx
+    import numpy as np
+    import requests
     import torch
+    import yaml
     from instructlab.eval.mmlu import MMLUBranchEvaluator
     from instructlab.eval.mt_bench import MTBenchBranchEvaluator
-    from instructlab.model.evaluate import qa_pairs_to_qna_to_avg_scores, sort_score
+    from instructlab.model.backends.common import free_tcp_ipv4_port
+    from instructlab.model.backends.vllm import wait_for_stable_vram
 
-    if judge_ca_cert := os.getenv("JUDGE_CA_CERT_PATH"):
-        import httpx
-        import openai
+    # orjson is much faster than the stdlib encoder for the large qa_pairs reports, fall back
+    # to json when it is not available in the image
+    try:
+        import orjson
 
-        # Create a custom HTTP client
-        class CustomHttpClient(httpx.Client):
-            def __init__(self, *args, **kwargs):
-                # Use the custom CA certificate
-                kwargs.setdefault("verify", judge_ca_cert)
-                super().__init__(*args, **kwargs)
+        def json_dumps(data) -> bytes:
+            return orjson.dumps(
+                data, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY
+            )
+    except ImportError:
 
-        # Create a new OpenAI class that uses the custom HTTP client
-        class CustomOpenAI(openai.OpenAI):
-            def __init__(self, *args, **kwargs):
-                custom_client = CustomHttpClient()
-                super().__init__(http_client=custom_client, *args, **kwargs)
+        def json_dumps(data) -> bytes:
+            return json.dumps(data, indent=2).encode("utf-8")
 
-        # Monkey patch the OpenAI class in the openai module, so that the eval lib can use it
-        openai.OpenAI = CustomOpenAI
+    judge_api_key = os.getenv("JUDGE_API_KEY", "")
+    judge_model_name = os.getenv("JUDGE_NAME")
+    judge_endpoint = os.getenv("JUDGE_ENDPOINT")
+    judge_ca_cert_path = os.getenv("JUDGE_CA_CERT_PATH")
+    use_tls = os.path.exists(judge_ca_cert_path) and (
+        os.path.getsize(judge_ca_cert_path) > 0
+    )
+    # Load the CA bundle once, httpx would otherwise parse the certificate file again for
+    # every client it builds
+    judge_ssl_context = (
+        ssl.create_default_context(cafile=judge_ca_cert_path) if use_tls else True
+    )
+    # Both branch evaluators judge against the same remote endpoint, share one client so
+    # the TLS handshake is paid once and the connections are kept alive between them.
+    # Multiplex the requests over HTTP/2 when the h2 package is available.
+    try:
+        import h2  # noqa: F401
+
+        http2 = True
+    except ImportError:
+        http2 = False
+    judge_http_client = httpx.Client(
+        http2=http2,
+        limits=httpx.Limits(max_connections=256, max_keepalive_connections=64),
+        timeout=httpx.Timeout(600.0, connect=10.0),
+        verify=judge_ssl_context,
+    )
 
     print("Starting Final Eval...")
 
     def launch_vllm(
-        model_path: str, gpu_count: int, retries: int = 120, delay: int = 10
+        model_path: str,
+        gpu_count: int,
+        timeout: int = 1200,
+        visible_devices: str = None,
+        max_num_seqs: int = 512,
+        max_num_batched_tokens: int = 16384,
+        block_size: int = 32,
+        enable_prefix_caching: bool = True,
+        gpu_memory_utilization: float = 0.93,
+        quantization: str = None,
+        kv_cache_dtype: str = None,
     ) -> tuple:
-        import subprocess
-        import sys
-        import time
-
-        import requests
-        from instructlab.model.backends.common import free_tcp_ipv4_port
-
         free_port = free_tcp_ipv4_port("127.0.0.1")
         port = str(free_port)
         vllm_server = f"http://127.0.0.1:{port}/v1"
@@ -1933,40 +2243,79 @@ def run_final_eval_op(
             port,
             "--model",
             model_path,
+            "--max-num-seqs",
+            str(max_num_seqs),
+            "--block-size",
+            str(block_size),
+            "--gpu-memory-utilization",
+            str(gpu_memory_utilization),
+            "--disable-log-requests",
         ]
+        if max_num_batched_tokens:
+            # vLLM refuses to start when the batched tokens budget is lower than the model
+            # context length, so never go below it
+            try:
+                with open(f"{model_path}/config.json", "r", encoding="utf-8") as f:
+                    max_model_len = json.load(f).get("max_position_embeddings", 0)
+            except (OSError, ValueError):
+                max_model_len = 0
+            command += [
+                "--max-num-batched-tokens",
+                str(max(max_num_batched_tokens, max_model_len)),
+            ]
+        # MT-Bench prompts share the same system prompt, so cached prefixes are reused
+        if enable_prefix_caching:
+            command += ["--enable-prefix-caching"]
+        if quantization:
+            command += ["--quantization", quantization]
+        if kv_cache_dtype:
+            command += ["--kv-cache-dtype", kv_cache_dtype]
         if gpu_count > 0:
             command += [
                 "--tensor-parallel-size",
                 str(gpu_count),
             ]
 
-        process = subprocess.Popen(args=command)
+        env = None
+        if visible_devices is not None:
+            env = {**os.environ, "CUDA_VISIBLE_DEVICES": visible_devices}
+
+        process = subprocess.Popen(args=command, env=env)
 
         print(f"Waiting for vLLM server to start at {vllm_server}...")
 
-        for attempt in range(retries):
+        # vLLM typically starts in 15-60 seconds, poll the lightweight health endpoint with
+        # an exponential backoff instead of a fixed 10 seconds delay
+        health_url = f"http://127.0.0.1:{port}/health"
+        deadline = time.monotonic() + timeout
+        delay = 0.5
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(
+                    f"vLLM server exited with code {process.returncode} before becoming ready."
+                )
             try:
-                response = requests.get(f"{vllm_server}/models", timeout=10)
+                response = requests.get(health_url, timeout=1)
                 if response.status_code == 200:
                     print(f"vLLM server is up and running at {vllm_server}.")
                     return process, vllm_server
-            except requests.ConnectionError:
+            except requests.RequestException:
                 pass
 
-            print(
-                f"Server not available yet, retrying in {delay} seconds (Attempt {attempt + 1}/{retries})..."
-            )
+            print(f"Server not available yet, retrying in {delay:.1f} seconds...")
             time.sleep(delay)
+            delay = min(delay * 1.5, 10)
 
         raise RuntimeError(
-            f"Failed to start vLLM server at {vllm_server} after {retries} retries."
+            f"Failed to start vLLM server at {vllm_server} after {timeout} seconds."
         )
 
-    def shutdown_vllm(process: subprocess.Popen, timeout: int = 20):
-        import subprocess
-
-        from instructlab.model.backends.vllm import wait_for_stable_vram
-
+    def shutdown_vllm(
+        process: subprocess.Popen,
+        visible_devices: str = None,
+        concurrent_servers: bool = False,
+        timeout: int = 20,
+    ):
         try:
             process.terminate()
             process.wait(timeout=timeout)
@@ -1987,7 +2336,64 @@ def run_final_eval_op(
         # vLLM relies on stable VRAM,  residual reclamation activity
         # can lead to crashes on restart. To prevent this add a
         # short delay (typically ~ 10 seconds, max 30) to verify stability.
-        wait_for_stable_vram(30)
+        # When the GPUs of the stopped server are already back to their idle usage the short
+        # delay is enough. Only those GPUs are measured, other servers may use the others.
+        if not concurrent_servers:
+            wait_for_stable_vram(10 if gpus_back_to_idle(visible_devices) else 30)
+            return
+        # wait_for_stable_vram watches every GPU of this process, the servers still running on
+        # the other GPUs would keep it from settling. Wait for the GPUs of the stopped server
+        # to be back to their idle usage instead.
+        deadline = time.monotonic() + 30
+        while not gpus_back_to_idle(visible_devices) and time.monotonic() < deadline:
+            time.sleep(1)
+
+    # gpu_memory returns the (index, uuid, used, total) memory of every GPU as reported by
+    # nvidia-smi
+    def gpu_memory():
+        try:
+            output = subprocess.run(
+                [
+                    "nvidia-smi",
+                    "--query-gpu=index,uuid,memory.used,memory.total",
+                    "--format=csv,noheader,nounits",
+                ],
+                capture_output=True,
+                check=True,
+                text=True,
+            ).stdout
+            return [
+                (index, uuid, int(used), int(total))
+                for index, uuid, used, total in (
+                    (field.strip() for field in line.split(","))
+                    for line in output.splitlines()
+                )
+            ]
+        except (OSError, ValueError, subprocess.CalledProcessError):
+            return None
+
+    # gpus_back_to_idle tells whether the given GPUs, all of them by default, use no more
+    # memory than before any vLLM server was started. CUDA_VISIBLE_DEVICES style device
+    # lists may name the GPUs by index or by UUID.
+    def gpus_back_to_idle(visible_devices: str = None) -> bool:
+        memory = gpu_memory()
+        if memory is None or idle_gpu_memory is None:
+            return False
+        devices = (
+            {device.strip() for device in visible_devices.split(",")}
+            if visible_devices
+            else None
+        )
+        idle_used = {index: used for index, _, used, _ in idle_gpu_memory}
+        measured = [
+            (index, used, total)
+            for index, uuid, used, total in memory
+            if devices is None or index in devices or uuid in devices
+        ]
+        return bool(measured) and all(
+            index in idle_used and used - idle_used[index] <= 0.02 * total
+            for index, used, total in measured
+        )
 
     # For standalone mode
     if candidate_model is None:
@@ -2005,32 +2411,31 @@ def run_final_eval_op(
     ) -> str:
         # Generates a JSON object from the _branch benchmark evaluations
 
-        import json
-
         summary = {"improvements": [], "regressions": [], "no_changes": [], "new": []}
 
         if len(improvements) > 0:
-            improvements.sort(key=sort_score, reverse=True)
+            # sort by delta
+            improvements.sort(key=itemgetter(1), reverse=True)
             for improvement in improvements:
                 task, delta, base_score, new_score = improvement
                 summary["improvements"].append(
                     {
                         "task": task,
-                        "base_score": round(base_score, 2),
-                        "new_score": round(new_score, 2),
+                        "base_score": base_score,
+                        "new_score": new_score,
                         "delta": delta,
                     }
                 )
 
         if len(regressions) > 0:
-            regressions.sort(key=sort_score)
+            regressions.sort(key=itemgetter(1))
             for regression in regressions:
                 task, delta, base_score, new_score = regression
                 summary["regressions"].append(
                     {
                         "task": task,
-                        "base_score": round(base_score, 2),
-                        "new_score": round(new_score, 2),
+                        "base_score": base_score,
+                        "new_score": new_score,
                         "delta": delta,
                     }
                 )
@@ -2038,18 +2443,66 @@ def run_final_eval_op(
         if len(no_changes) > 0:
             for entry in no_changes:
                 task, avg_score = entry
-                summary["no_changes"].append(
-                    {"task": task, "average_score": round(avg_score, 2)}
-                )
+                summary["no_changes"].append({"task": task, "average_score": avg_score})
 
         if new is not None and len(new) > 0:
             for entry in new:
-                _, avg_score = entry
+                qna, avg_score = entry
                 summary["new"].append(
                     {"qna": qna, "average_score": round(avg_score, 2)}
                 )
 
-        return json.dumps(summary, indent=4)
+        return json_dumps(summary).decode("utf-8")
+
+    # partition_score_deltas splits tasks into improvements, regressions and no changes,
+    # comparing all the scores at once with numpy rather than item by item. The scores are
+    # returned already rounded for the report.
+    def partition_score_deltas(tasks: list, scores, base_scores):
+        tasks = np.array(tasks, dtype=object)
+        raw_scores = np.fromiter(scores, dtype=np.float64, count=len(tasks))
+        raw_base_scores = np.fromiter(base_scores, dtype=np.float64, count=len(tasks))
+        deltas = np.round(raw_scores - raw_base_scores, 2)
+        scores = np.round(raw_scores, 2)
+        base_scores = np.round(raw_base_scores, 2)
+
+        def select(mask):
+            return list(
+                zip(
+                    tasks[mask].tolist(),
+                    deltas[mask].tolist(),
+                    base_scores[mask].tolist(),
+                    scores[mask].tolist(),
+                )
+            )
+
+        unchanged = raw_scores == raw_base_scores
+        no_changes = list(zip(tasks[unchanged].tolist(), scores[unchanged].tolist()))
+        return (
+            select(raw_scores > raw_base_scores),
+            select(raw_scores < raw_base_scores),
+            no_changes,
+        )
+
+    # qa_pairs_to_qna_to_avg_scores averages the scores of every qna file. This is the
+    # numpy equivalent of instructlab.model.evaluate.qa_pairs_to_qna_to_avg_scores, the
+    # qna files keep the order in which they first appear in qa_pairs.
+    def qa_pairs_to_qna_to_avg_scores(qa_pairs: list) -> dict:
+        if not qa_pairs:
+            return {}
+        qnas, first_index, inverse, counts = np.unique(
+            np.array([qa_pair["qna_file"] for qa_pair in qa_pairs], dtype=object),
+            return_index=True,
+            return_inverse=True,
+            return_counts=True,
+        )
+        scores = np.fromiter(
+            (qa_pair["score"] for qa_pair in qa_pairs),
+            dtype=np.float64,
+            count=len(qa_pairs),
+        )
+        avg_scores = np.bincount(inverse, weights=scores) / counts
+        order = np.argsort(first_index)
+        return dict(zip(qnas[order].tolist(), avg_scores[order].tolist()))
 
     ######################################################################
     print("Checking GPUs...")
@@ -2060,9 +2513,67 @@ def run_final_eval_op(
         else "No GPU available"
     )
     gpu_count = torch.cuda.device_count() if gpu_available else 0
+    # GPU usage before any vLLM server is started
+    idle_gpu_memory = gpu_memory()
 
     print(f"GPU Available: {gpu_available}, Using: {gpu_name}")
 
+    # fits_gpus tells whether a model can be served with tensor parallelism over the given
+    # number of GPUs: its weights must fit in their memory, like fits_single_gpu of the
+    # MT-Bench component, and its attention heads must split evenly between them
+    def fits_gpus(model_path: str, gpus: int) -> bool:
+        try:
+            with open(f"{model_path}/config.json", "r", encoding="utf-8") as f:
+                num_attention_heads = json.load(f).get("num_attention_heads")
+            weights_size = sum(
+                entry.stat().st_size
+                for entry in os.scandir(model_path)
+                if entry.name.endswith((".safetensors", ".bin"))
+            )
+        except (OSError, ValueError):
+            return False
+        if not num_attention_heads or num_attention_heads % gpus:
+            return False
+        total_memory = torch.cuda.get_device_properties(0).total_memory
+        return weights_size < total_memory * gpus * 0.8
+
+    # The candidate and base models are served by independent vLLM processes, so with more
+    # than one GPU we split the GPUs between them and evaluate both models concurrently
+    # instead of leaving half of the GPUs idle. Only the concurrent branches are given their
+    # own visible devices. The model path is the last argument of every branch; when a
+    # model does not fit its share of the GPUs, the branches run one after the other on all
+    # of them.
+    def run_model_branches(run_branch, branch_args: list) -> list:
+        gpus_per_branch = gpu_count // len(branch_args) if branch_args else 0
+        if (
+            len(branch_args) < 2
+            or gpus_per_branch < 1
+            or not all(fits_gpus(args[-1], gpus_per_branch) for args in branch_args)
+        ):
+            return [run_branch(*args, gpu_count, None) for args in branch_args]
+
+        visible = os.getenv("CUDA_VISIBLE_DEVICES")
+        devices = visible.split(",") if visible else [str(i) for i in range(gpu_count)]
+        with ThreadPoolExecutor(max_workers=len(branch_args)) as executor:
+            futures = [
+                executor.submit(
+                    run_branch,
+                    *args,
+                    gpus_per_branch,
+                    ",".join(devices[i * gpus_per_branch : (i + 1) * gpus_per_branch]),
+                )
+                for i, args in enumerate(branch_args)
+            ]
+            return [future.result() for future in futures]
+
+    # A candidate initialized from the base model scores exactly like it, in that case the
+    # model is only served once and its results are reused for the base model
+    same_model = (
+        candidate_model is not None
+        and base_model_dir is not None
+        and os.path.realpath(candidate_model) == os.path.realpath(base_model_dir)
+    )
+
     if batch_size.isdigit():
         batch_size = int(batch_size)
 
@@ -2071,10 +2582,6 @@ def run_final_eval_op(
     # This is very specific to 'ilab generate', necessary because the data generation and
     # model evaluation are taking place in separate environments.
     def update_test_lines_in_files(base_dir):
-        import os
-
-        import yaml
-
         for root, _, files in os.walk(base_dir):
             for file_name in files:
                 if file_name.startswith("knowledge_") and file_name.endswith(
@@ -2098,18 +2605,19 @@ def run_final_eval_op(
 
     # find_node_dataset_directories to find sdg output node_datasets_*
     def find_node_dataset_directories(base_dir: str):
-        import os
-        import re
-
         # This is specific to ilab/eval output
-        pattern = r"node_datasets_"
+        # Only directories are visited and only the first match is used, so stop there
         matching_dirs = []
-        regex = re.compile(pattern)
-
-        for root, dirs, _ in os.walk(base_dir):
-            for directory in dirs:
-                if regex.search(directory):
-                    matching_dirs.append(os.path.join(root, directory))
+        stack = [base_dir]
+        while stack and not matching_dirs:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if not entry.is_dir(follow_symlinks=False):
+                        continue
+                    if entry.name.startswith("node_datasets_"):
+                        matching_dirs.append(entry)
+                        break
+                    stack.append(entry)
 
         # From 'ilab sdg' the knowledge_*_task.yaml files have a line that references where the SDG took place.
         # This needs to be updated to run elsewhere.
@@ -2147,17 +2655,28 @@ def run_final_eval_op(
             ),
         ]
         m_paths = [candidate_model, base_model_dir]
-        overall_scores = []
-        individual_scores_list = []
-        for i, evaluator in enumerate(mmlu_branch_evaluators):
-            m_path = m_paths[i]
+
+        def run_mmlu_branch(evaluator, m_path, gpus, visible_devices):
             print("Launching Vllm...")
-            vllm_process, vllm_server = launch_vllm(m_path, gpu_count)
+            vllm_process, vllm_server = launch_vllm(
+                m_path, gpus, visible_devices=visible_devices
+            )
             overall_score, individual_scores = evaluator.run(vllm_server)
-            overall_scores.append(overall_score)
-            individual_scores_list.append(individual_scores)
             print("Stopping Vllm")
-            shutdown_vllm(vllm_process)
+            shutdown_vllm(
+                vllm_process,
+                visible_devices,
+                concurrent_servers=visible_devices is not None,
+            )
+            return overall_score, individual_scores
+
+        branch_args = list(zip(mmlu_branch_evaluators, m_paths))
+        if same_model:
+            results = run_model_branches(run_mmlu_branch, branch_args[:1]) * 2
+        else:
+            results = run_model_branches(run_mmlu_branch, branch_args)
+        overall_scores = [overall_score for overall_score, _ in results]
+        individual_scores_list = [individual_scores for _, individual_scores in results]
 
         # TODO: update instructlab/instructlab model/evaluate.py
         # so this logic can be imported outside of the CLI
@@ -2166,18 +2685,12 @@ def run_final_eval_op(
         individual_scores = individual_scores_list[0]
         base_individual_scores = individual_scores_list[1]
 
-        improvements, regressions, no_changes = [], [], []
-        for task, score in individual_scores.items():
-            base_score = base_individual_scores[task]
-            s = score["score"]
-            b_s = base_score["score"]
-            d = round(s - b_s, 2)
-            if s > b_s:
-                improvements.append((task, d, b_s, s))
-            elif b_s > s:
-                regressions.append((task, d, b_s, s))
-            else:
-                no_changes.append((task, s))
+        tasks = list(individual_scores)
+        improvements, regressions, no_changes = partition_score_deltas(
+            tasks,
+            (individual_scores[task]["score"] for task in tasks),
+            (base_individual_scores[task]["score"] for task in tasks),
+        )
 
         summary = branch_eval_summary_to_json(
             improvements,
@@ -2195,8 +2708,8 @@ def run_final_eval_op(
             "summary": summary,
         }
 
-        with open(mmlu_branch_output, "w", encoding="utf-8") as f:
-            json.dump(mmlu_branch_data, f, indent=4)
+        with open(mmlu_branch_output, "wb") as f:
+            f.write(json_dumps(mmlu_branch_data))
     else:
         print("No MMLU tasks directories found, skipping MMLU_branch evaluation.")
 
@@ -2204,10 +2717,6 @@ def run_final_eval_op(
 
     print("Starting MT_BENCH_BRANCH ...")
 
-    judge_api_key = os.getenv("JUDGE_API_KEY", "")
-    judge_model_name = os.getenv("JUDGE_NAME")
-    judge_endpoint = os.getenv("JUDGE_ENDPOINT")
-
     output_dir = "/tmp/eval_output"
 
     # TODO: candidate_branch must be in same repo, not a fork, or, can compare main branch against candidate, base models
@@ -2220,21 +2729,27 @@ def run_final_eval_op(
     # https://github.com/instructlab/instructlab/blob/83ca501ecdd858677380046e2a56da5b2f3f14e7/src/instructlab/model/evaluate.py#L504
     #
     # With instructlab, model_name is synonomous with model_path
+    # The branches may be evaluated concurrently and may even share the same model and
+    # branch names, so each one writes its questions, answers and judgments to its own
+    # directory.
+    # vLLM only knows a model by the path it was launched with. When the candidate and base
+    # are the same model under different paths, e.g. a symlinked candidate_model, a single
+    # server is launched with candidate_model and both branches must request it by that name.
     mt_bench_evaluators = [
         MTBenchBranchEvaluator(
             model_name=candidate_model,
             judge_model_name=judge_model_name,
             taxonomy_git_repo_path=taxonomy_path,
             branch=candidate_branch,
-            output_dir=output_dir,
+            output_dir=os.path.join(output_dir, "candidate"),
             merge_system_user_message=merge_system_user_message,
         ),
         MTBenchBranchEvaluator(
-            model_name=base_model_dir,
+            model_name=candidate_model if same_model else base_model_dir,
             judge_model_name=judge_model_name,
             taxonomy_git_repo_path=taxonomy_path,
             branch=base_branch,
-            output_dir=output_dir,
+            output_dir=os.path.join(output_dir, "base"),
             merge_system_user_message=merge_system_user_message,
         ),
     ]
@@ -2243,43 +2758,88 @@ def run_final_eval_op(
     # with 'auto', number of gpus allocated for serving is calculated based on environment
     # https://github.com/instructlab/eval/blob/main/src/instructlab/eval/mt_bench.py#L36
     if max_workers == "auto":
-        try:
-            usable_cpu_count = len(os.sched_getaffinity(0)) // 2
-        except AttributeError:
-            import multiprocessing
-
-            usable_cpu_count = multiprocessing.cpu_count() // 2
+        usable_cpu_count = (
+            len(os.sched_getaffinity(0))
+            if hasattr(os, "sched_getaffinity")
+            else multiprocessing.cpu_count()
+        ) // 2
         max_workers = usable_cpu_count
 
     branches = [candidate_branch, base_branch]
     m_paths = [candidate_model, base_model_dir]
-    qa_pairs_and_errors = []
-    for i, evaluator in enumerate(mt_bench_evaluators):
-        branch = branches[i]
-        m_path = m_paths[i]
 
+    def run_mt_bench_branch(evaluator, branch, m_path, gpus, visible_devices):
         print(
             f"Generating questions and reference answers from qna files for branch {branch}..."
         )
-        vllm_process, vllm_server = launch_vllm(m_path, gpu_count)
+        vllm_process, vllm_server = launch_vllm(
+            m_path, gpus, visible_devices=visible_devices
+        )
 
         evaluator.gen_answers(
             server_url=vllm_server,
-            serving_gpus=gpu_count,
+            serving_gpus=gpus,
             max_workers=max_workers,
+            http_client=judge_http_client,
         )
 
-        shutdown_vllm(vllm_process)
+        shutdown_vllm(
+            vllm_process,
+            visible_devices,
+            concurrent_servers=visible_devices is not None,
+        )
 
         print(f"Evaluating answers for branch {branch}...")
         overall_score, qa_pairs, error_rate = evaluator.judge_answers(
             server_url=judge_endpoint,
             api_key=judge_api_key,
-            serving_gpus=gpu_count,
+            serving_gpus=gpus,
             max_workers=max_workers,
+            http_client=judge_http_client,
         )
 
-        qa_pairs_and_errors.append((overall_score, qa_pairs, error_rate))
+        return overall_score, qa_pairs, error_rate
+
+    # The questions still differ between the branches, so the shared server answers the
+    # questions of both branches before it is shut down
+    def run_shared_mt_bench_branches():
+        vllm_process, vllm_server = launch_vllm(candidate_model, gpu_count)
+        for evaluator, branch in zip(mt_bench_evaluators, branches):
+            print(
+                f"Generating questions and reference answers from qna files for branch {branch}..."
+            )
+            evaluator.gen_answers(
+                server_url=vllm_server,
+                serving_gpus=gpu_count,
+                max_workers=max_workers,
+                http_client=judge_http_client,
+            )
+
+        shutdown_vllm(vllm_process)
+
+        results = []
+        for evaluator, branch in zip(mt_bench_evaluators, branches):
+            print(f"Evaluating answers for branch {branch}...")
+            results.append(
+                evaluator.judge_answers(
+                    server_url=judge_endpoint,
+                    api_key=judge_api_key,
+                    serving_gpus=gpu_count,
+                    max_workers=max_workers,
+                    http_client=judge_http_client,
+                )
+            )
+        return results
+
+    branch_args = list(zip(mt_bench_evaluators, branches, m_paths))
+    if same_model and candidate_branch == base_branch:
+        qa_pairs_and_errors = (
+            run_model_branches(run_mt_bench_branch, branch_args[:1]) * 2
+        )
+    elif same_model:
+        qa_pairs_and_errors = run_shared_mt_bench_branches()
+    else:
+        qa_pairs_and_errors = run_model_branches(run_mt_bench_branch, branch_args)
 
     overall_score, qa_pairs, error_rate = qa_pairs_and_errors[0]
     base_overall_score, base_qa_pairs, base_error_rate = qa_pairs_and_errors[1]
@@ -2287,33 +2847,21 @@ def run_final_eval_op(
     qna_to_avg_scores = qa_pairs_to_qna_to_avg_scores(qa_pairs)
     base_qna_to_avg_scores = qa_pairs_to_qna_to_avg_scores(base_qa_pairs)
 
-    improvements, regressions, no_changes, new_qnas = [], [], [], []
-
+    # Split the qnas in a single pass, a sentinel tells qnas missing from the base apart
+    missing = object()
+    qnas, avg_scores, base_avg_scores, new_qnas = [], [], [], []
     for qna, avg_score in qna_to_avg_scores.items():
-        base_avg_score = base_qna_to_avg_scores.get(qna)
-        if base_avg_score is not None:
-            if avg_score > base_avg_score:
-                improvements.append(
-                    (
-                        qna,
-                        round(avg_score - base_avg_score, 2),
-                        base_avg_score,
-                        avg_score,
-                    )
-                )
-            elif avg_score == base_avg_score:
-                no_changes.append((qna, avg_score))
-            else:
-                regressions.append(
-                    (
-                        qna,
-                        round(avg_score - base_avg_score, 2),
-                        base_avg_score,
-                        avg_score,
-                    )
-                )
-        else:
+        base_avg_score = base_qna_to_avg_scores.get(qna, missing)
+        if base_avg_score is missing:
             new_qnas.append((qna, avg_score))
+            continue
+        qnas.append(qna)
+        avg_scores.append(avg_score)
+        base_avg_scores.append(base_avg_score)
+
+    improvements, regressions, no_changes = partition_score_deltas(
+        qnas, avg_scores, base_avg_scores
+    )
 
     error_rate = (error_rate + base_error_rate) / 2
     if error_rate > 0:
@@ -2337,8 +2885,8 @@ def run_final_eval_op(
         "summary": summary,
     }
 
-    with open(mt_bench_branch_output, "w", encoding="utf-8") as f:
-        json.dump(mt_bench_branch_data, f, indent=4)
+    with open(mt_bench_branch_output, "wb") as f:
+        f.write(json_dumps(mt_bench_branch_data))
 """
     exec_run_final_eval_op_args = f"""
 run_final_eval_op(mmlu_branch_output="{MMLU_BRANCH_SCORES_PATH}", mt_bench_branch_output="{MT_BENCH_BRANCH_SCORES_PATH}", candidate_model="{CANDIDATE_MODEL_PATH}", taxonomy_path="{TAXONOMY_PATH}", sdg_path="{DATA_PVC_SDG_PATH}", base_branch="", candidate_branch="", base_model_dir="{DATA_PVC_MODEL_PATH}", max_workers="{MAX_WORKERS}", merge_system_user_message={MERGE_SYSTEM_USER_MESSAGE}, few_shots={FEW_SHOTS}, batch_size="{BATCH_SIZE}")
@@ -2475,7 +3023,7 @@ def log_pod_containers(
         kubernetes.client.rest.ApiException: If there is an error other than a 400 status error when
         retrieving the logs. due to a 400 status error, it continues to the next container.
     """
-    core_v1 = kubernetes.client.CoreV1Api()
+    core_v1 = kubernetes.client.CoreV1Api(get_api_client())
     containers = getattr(pod.spec, container_type)
     if containers is None:
         return
@@ -2516,8 +3064,8 @@ def run_job(namespace: str, job: kubernetes.client.V1Job) -> str:
     either succeeds or fails. If the job fails, it will also print the logs of the failed pod.
     """
     # Create a job
-    batch_v1 = kubernetes.client.BatchV1Api()
-    core_v1 = kubernetes.client.CoreV1Api()
+    batch_v1 = kubernetes.client.BatchV1Api(get_api_client())
+    core_v1 = kubernetes.client.CoreV1Api(get_api_client())
     try:
         resp = batch_v1.create_namespaced_job(body=job, namespace=namespace)
         logger.info("Job created '%s/%s'", namespace, resp.metadata.name)
@@ -2547,6 +3095,7 @@ def run_job(namespace: str, job: kubernetes.client.V1Job) -> str:
             for event in w.stream(
                 batch_v1.list_namespaced_job,
                 namespace=namespace,
+                field_selector=f"metadata.name={job.metadata.name}",
                 timeout_seconds=60,  # Timeout after 1 minutes
             ):
                 job_event = event["object"]
@@ -2715,7 +3264,7 @@ def initial_setup(ctx: click.Context) -> None:
     logger.info("Running setup for SDG data fetch.")
 
     # Request the Kubernetes API
-    v1 = kubernetes.client.CoreV1Api()
+    v1 = kubernetes.client.CoreV1Api(get_api_client())
 
     # SDG Data Fetch secret
     if (
@@ -2778,9 +3327,6 @@ def initial_setup(ctx: click.Context) -> None:
                     name=sdg_object_store_secret, namespace=namespace
                 )
 
-                def decode_base64(data):
-                    return base64.b64decode(data).decode("utf-8")
-
                 if secret.data.get("endpoint"):
                     endpoint = decode_base64(secret.data.get("endpoint"))
                     validate_url(endpoint)
@@ -2969,7 +3515,7 @@ def sdg(
     sdg_pipeline = ctx.obj["sdg_pipeline"]
     sdg_sampling_size = ctx.obj["sdg_sampling_size"]
 
-    v1 = kubernetes.client.CoreV1Api()
+    v1 = kubernetes.client.CoreV1Api(get_api_client())
     # Secret details validation here!
     # Check if all required arguments are provided for Data Fetch
     if not sdg_serving_model_secret:
@@ -3034,9 +3580,6 @@ def sdg(
                     name=sdg_serving_model_secret, namespace=namespace
                 )
 
-                def decode_base64(data):
-                    return base64.b64decode(data).decode("utf-8")
-
                 if not all(
                     [
                         secret.data.get("api_key"),
@@ -3238,7 +3781,7 @@ def train(
         )
         return
 
-    api = kubernetes.client.CustomObjectsApi()
+    api = kubernetes.client.CustomObjectsApi(get_api_client())
 
     try:
         api.create_namespaced_custom_object(
@@ -3260,7 +3803,7 @@ def train(
             raise
 
     # Get the CR status and wait for it to be completed
-    core_v1 = kubernetes.client.CoreV1Api()
+    core_v1 = kubernetes.client.CoreV1Api(get_api_client())
     w = kubernetes.watch.Watch()
     exit_flag = False
     # TODO: this block is getting really deep, would be nice to refactor one day
@@ -3273,6 +3816,7 @@ def train(
                 version="v1",
                 namespace=namespace,
                 plural="pytorchjobs",
+                field_selector=f"metadata.name={pytorch_training_job_yaml['metadata']['name']}",
                 timeout_seconds=60,  # Timeout after 1 minutes
             ):
                 pytorchjob_event = event["object"]
@@ -23,6 +23,7 @@ TODO:
 """
 
 import base64
+import functools
 import json
 import logging
 import os
@@ -312,6 +313,7 @@ if [ "$STRATEGY" == "upload" ]; then
       --gzip \
       --verbose \
       --ignore-failed-read \
+      --dereference \
       --file "$FINAL_DATA_TAR_PATH" {mt_bench_output_path} {mt_bench_scores_path} {mt_bench_branch_scores_path} {mmlu_branch_scores_path} {candidate_model_path}
 fi
 
@@ -1061,6 +1063,33 @@ def run(
         ctx.invoke(upload_trained_model)
 
 
+@functools.cache
+def get_api_client() -> kubernetes.client.ApiClient:
+    """
+    Return the Kubernetes API client shared by every API object of the script.
+
+    Each API object created without a client builds its own connection pool, reusing a single
+    client keeps the connections to the API server (and their TLS sessions) alive across calls.
+
+    Returns:
+        kubernetes.client.ApiClient: The shared Kubernetes API client.
+    """
+    return kubernetes.client.ApiClient()
+
+
+def decode_base64(data: str) -> str:
+    """
+    Decode a base64 encoded Kubernetes Secret value.
+
+    Args:
+        data (str): The base64 encoded value.
+
+    Returns:
+        str: The decoded value.
+    """
+    return base64.b64decode(data).decode("utf-8")
+
+
 def get_security_context() -> kubernetes.client.V1SecurityContext:
     """
     Get the security context.
@@ -1555,7 +1584,7 @@ def log_pod_containers(
         kubernetes.client.rest.ApiException: If there is an error other than a 400 status error when
         retrieving the logs. due to a 400 status error, it continues to the next container.
     """
-    core_v1 = kubernetes.client.CoreV1Api()
+    core_v1 = kubernetes.client.CoreV1Api(get_api_client())
     containers = getattr(pod.spec, container_type)
     if containers is None:
         return
@@ -1596,8 +1625,8 @@ def run_job(namespace: str, job: kubernetes.client.V1Job) -> str:
     either succeeds or fails. If the job fails, it will also print the logs of the failed pod.
     """
     # Create a job
-    batch_v1 = kubernetes.client.BatchV1Api()
-    core_v1 = kubernetes.client.CoreV1Api()
+    batch_v1 = kubernetes.client.BatchV1Api(get_api_client())
+    core_v1 = kubernetes.client.CoreV1Api(get_api_client())
     try:
         resp = batch_v1.create_namespaced_job(body=job, namespace=namespace)
         logger.info("Job created '%s/%s'", namespace, resp.metadata.name)
@@ -1627,6 +1656,7 @@ def run_job(namespace: str, job: kubernetes.client.V1Job) -> str:
             for event in w.stream(
                 batch_v1.list_namespaced_job,
                 namespace=namespace,
+                field_selector=f"metadata.name={job.metadata.name}",
                 timeout_seconds=60,  # Timeout after 1 minutes
             ):
                 job_event = event["object"]
@@ -1795,7 +1825,7 @@ def initial_setup(ctx: click.Context) -> None:
     logger.info("Running setup for SDG data fetch.")
 
     # Request the Kubernetes API
-    v1 = kubernetes.client.CoreV1Api()
+    v1 = kubernetes.client.CoreV1Api(get_api_client())
 
     # SDG Data Fetch secret
     if (
@@ -1858,9 +1888,6 @@ def initial_setup(ctx: click.Context) -> None:
                     name=sdg_object_store_secret, namespace=namespace
                 )
 
-                def decode_base64(data):
-                    return base64.b64decode(data).decode("utf-8")
-
                 if secret.data.get("endpoint"):
                     endpoint = decode_base64(secret.data.get("endpoint"))
                     validate_url(endpoint)
@@ -2049,7 +2076,7 @@ def sdg(
     sdg_pipeline = ctx.obj["sdg_pipeline"]
     sdg_sampling_size = ctx.obj["sdg_sampling_size"]
 
-    v1 = kubernetes.client.CoreV1Api()
+    v1 = kubernetes.client.CoreV1Api(get_api_client())
     # Secret details validation here!
     # Check if all required arguments are provided for Data Fetch
     if not sdg_serving_model_secret:
@@ -2114,9 +2141,6 @@ def sdg(
                     name=sdg_serving_model_secret, namespace=namespace
                 )
 
-                def decode_base64(data):
-                    return base64.b64decode(data).decode("utf-8")
-
                 if not all(
                     [
                         secret.data.get("api_key"),
@@ -2318,7 +2342,7 @@ def train(
         )
         return
 
-    api = kubernetes.client.CustomObjectsApi()
+    api = kubernetes.client.CustomObjectsApi(get_api_client())
 
     try:
         api.create_namespaced_custom_object(
@@ -2340,7 +2364,7 @@ def train(
             raise
 
     # Get the CR status and wait for it to be completed
-    core_v1 = kubernetes.client.CoreV1Api()
+    core_v1 = kubernetes.client.CoreV1Api(get_api_client())
     w = kubernetes.watch.Watch()
     exit_flag = False
     # TODO: this block is getting really deep, would be nice to refactor one day
@@ -2353,6 +2377,7 @@ def train(
                 version="v1",
                 namespace=namespace,
                 plural="pytorchjobs",
+                field_selector=f"metadata.name={pytorch_training_job_yaml['metadata']['name']}",
                 timeout_seconds=60,  # Timeout after 1 minutes
             ):
                 pytorchjob_event = event["object"]
@@ -0,0 +1,131 @@
+import os
+import subprocess
+import sys
+import types
+from unittest import mock
+
+import pytest
+
+from eval.final.components import run_final_eval_op
+
+pytest.importorskip("numpy")
+
+
+class FakeVLLMProcess:
+    """Stands in for the vLLM server process, it serves the model it was launched with."""
+
+    def __init__(self, args, env=None):
+        self.args = args
+        self.pid = 1
+        self.returncode = None
+
+    @property
+    def served_model_name(self):
+        option = (
+            "--served-model-name" if "--served-model-name" in self.args else "--model"
+        )
+        return self.args[self.args.index(option) + 1]
+
+    def poll(self):
+        return self.returncode
+
+    def terminate(self):
+        self.returncode = 0
+
+    def kill(self):
+        self.returncode = -9
+
+    def wait(self, timeout=None):
+        return self.returncode
+
+
+@pytest.fixture
+def vllm_processes(monkeypatch):
+    processes = []
+
+    def popen(args, env=None):
+        processes.append(FakeVLLMProcess(args, env))
+        return processes[-1]
+
+    def run(*args, **kwargs):
+        raise FileNotFoundError("nvidia-smi")
+
+    monkeypatch.setattr(subprocess, "Popen", popen)
+    monkeypatch.setattr(subprocess, "run", run)
+    return processes
+
+
+@pytest.fixture
+def eval_modules(monkeypatch, vllm_processes):
+    class FakeMTBenchBranchEvaluator:
+        def __init__(self, model_name, **kwargs):
+            self.model_name = model_name
+
+        def gen_answers(self, server_url, **kwargs):
+            running = [p for p in vllm_processes if p.returncode is None]
+            if self.model_name not in {p.served_model_name for p in running}:
+                raise RuntimeError(f"The model `{self.model_name}` does not exist.")
+
+        def judge_answers(self, **kwargs):
+            return 5.0, [], 0.0
+
+    torch = mock.MagicMock()
+    torch.cuda.is_available.return_value = False
+    requests = types.SimpleNamespace(
+        get=lambda url, timeout: types.SimpleNamespace(status_code=200),
+        RequestException=Exception,
+    )
+    modules = {
+        "httpx": mock.MagicMock(),
+        "requests": requests,
+        "torch": torch,
+        "instructlab": mock.MagicMock(),
+        "instructlab.eval": mock.MagicMock(),
+        "instructlab.eval.mmlu": mock.MagicMock(),
+        "instructlab.eval.mt_bench": types.SimpleNamespace(
+            MTBenchBranchEvaluator=FakeMTBenchBranchEvaluator
+        ),
+        "instructlab.model": mock.MagicMock(),
+        "instructlab.model.backends": mock.MagicMock(),
+        "instructlab.model.backends.common": types.SimpleNamespace(
+            free_tcp_ipv4_port=lambda host: 8000
+        ),
+        "instructlab.model.backends.vllm": mock.MagicMock(),
+    }
+    for name, module in modules.items():
+        monkeypatch.setitem(sys.modules, name, module)
+
+
+def test_shared_server_serves_symlinked_candidate_to_both_branches(
+    tmp_path, monkeypatch, eval_modules, vllm_processes
+):
+    base_model_dir = tmp_path / "model"
+    base_model_dir.mkdir()
+    # run_mt_bench_op links the best checkpoint as candidate_model
+    (tmp_path / "output").mkdir()
+    candidate_model = tmp_path / "output" / "candidate_model"
+    candidate_model.symlink_to(os.path.join("..", "model"))
+    (tmp_path / "sdg").mkdir()
+    monkeypatch.setenv("JUDGE_CA_CERT_PATH", str(tmp_path / "ca.crt"))
+    monkeypatch.setenv("JUDGE_NAME", "judge")
+    monkeypatch.setenv("JUDGE_ENDPOINT", "http://judge")
+
+    run_final_eval_op.python_func(
+        mmlu_branch_output=types.SimpleNamespace(path=str(tmp_path / "mmlu.json")),
+        mt_bench_branch_output=types.SimpleNamespace(
+            path=str(tmp_path / "mt_bench.json")
+        ),
+        base_model_dir=str(base_model_dir),
+        base_branch="main",
+        candidate_branch="candidate",
+        max_workers="1",
+        few_shots=5,
+        batch_size="1",
+        merge_system_user_message=False,
+        candidate_model=str(candidate_model),
+        taxonomy_path=str(tmp_path / "taxonomy"),
+        sdg_path=str(tmp_path / "sdg"),
+    )
+
+    assert [p.served_model_name for p in vllm_processes] == [str(candidate_model)]
+    assert (tmp_path / "mt_bench.json").exists()
@@ -0,0 +1,25 @@
+import yaml
+from kfp import compiler
+
+from pipeline import ilab_pipeline_wrapper
+
+
+def test_delete_pvcs_receives_the_created_pvc_names(tmp_path):
+    pipeline_file = tmp_path / "pipeline.yaml"
+    compiler.Compiler().compile(ilab_pipeline_wrapper(frozenset()), str(pipeline_file))
+    with open(pipeline_file, "r", encoding="utf-8") as f:
+        pipeline_spec = next(yaml.safe_load_all(f))
+
+    tasks = pipeline_spec["root"]["dag"]["tasks"]
+    parameters = tasks["delete-pvcs-op"]["inputs"]["parameters"]
+    # Each PVC name must be wired to the output of its CreatePVC task, not passed as a
+    # constant holding an unresolved placeholder
+    assert set(parameters) == {"output_pvc_name", "input_pvc_name", "model_pvc_name"}
+    producers = set()
+    for parameter in parameters.values():
+        assert "runtimeValue" not in parameter
+        output = parameter["taskOutputParameter"]
+        assert output["outputParameterKey"] == "name"
+        assert tasks[output["producerTask"]]["taskInfo"]["name"].startswith("createpvc")
+        producers.add(output["producerTask"])
+    assert len(producers) == 3
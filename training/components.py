@@ -97,26 +97,20 @@ def data_processing_op(
 
 
 @dsl.container_component
-def skills_processed_data_to_artifact_op(
+def processed_data_to_artifacts_op(
     skills_processed_data: dsl.Output[dsl.Dataset],
-    pvc_path: str = "/data/skills",
-):
-    return dsl.ContainerSpec(
-        TOOLBOX_IMAGE,
-        ["/bin/sh", "-c"],
-        [f"cp -r {pvc_path} {skills_processed_data.path}"],
-    )
-
-
-@dsl.container_component
-def knowledge_processed_data_to_artifact_op(
     knowledge_processed_data: dsl.Output[dsl.Dataset],
-    pvc_path: str = "/data/knowledge",
+    skills_path: str = "/data/skills",
+    knowledge_path: str = "/data/knowledge",
 ):
+    # Both datasets live on the same PVC, export them from a single pod
     return dsl.ContainerSpec(
         TOOLBOX_IMAGE,
         ["/bin/sh", "-c"],
-        [f"cp -r {pvc_path} {knowledge_processed_data.path}"],
+        [
+            f"cp -r {skills_path} {skills_processed_data.path} && "
+            f"cp -r {knowledge_path} {knowledge_processed_data.path}"
+        ],
     )
 
 
@@ -138,23 +132,19 @@ def pytorchjob_manifest_op(
     max_batch_len: int = 20000,
     seed: int = 42,
 ):
-    import inspect
+    import copy
     import os
     import time
 
     import kubernetes
     import urllib3
-    import yaml
 
     def list_phase1_final_model():
         model_dir = "/output/phase_1/model/hf_format"
-        models = os.listdir(model_dir)
-        newest_idx = max(
-            (os.path.getmtime(f"{model_dir}/{model}"), i)
-            for i, model in enumerate(models)
-        )[-1]
-        newest_model = models[newest_idx]
-        return f"{model_dir}/{newest_model}"
+        # scandir returns the entries with their paths in a single directory listing
+        with os.scandir(model_dir) as entries:
+            newest_model = max(entries, key=lambda entry: entry.stat().st_mtime)
+        return newest_model.path
 
     name = f"train-phase-{phase_num}-{name_suffix.rstrip('-sdg')}"
 
@@ -169,180 +159,118 @@ def pytorchjob_manifest_op(
 
     image = "registry.stage.redhat.io/rhelai1/instructlab-nvidia-rhel9:1.3.1"
 
-    manifest = inspect.cleandoc(
-        f"""
-        apiVersion: kubeflow.org/v1
-        kind: PyTorchJob
-        metadata:
-          name: {name}
-        spec:
-          nprocPerNode: \"{nproc_per_node}\"
-          pytorchReplicaSpecs:
-            Master:
-              replicas: 1
-              restartPolicy: OnFailure
-              template:
-                metadata:
-                  annotations:
-                    sidecar.istio.io/inject: 'false'
-                spec:
-                  containers:
-                    - args:
-                        - |
-                          echo "Running phase {phase_num}"
-                          echo "Using {path_to_model} model for training"
-                          echo "Using {path_to_data} data for training"
-                          mkdir -p /output/phase_{phase_num}/model;
-                          mkdir -p /output/data;
-                          torchrun --nnodes {nnodes} \
-                              --nproc_per_node {nproc_per_node} \
-                              --node_rank \$(RANK) \
-                              --rdzv_endpoint \$(MASTER_ADDR):\$(MASTER_PORT) \
-                              -m instructlab.training.main_ds \
-                              --model_name_or_path={path_to_model} \
-                              --data_path={path_to_data} \
-                              --output_dir=/output/phase_{phase_num}/model \
-                              --num_epochs={num_epochs} \
-                              --effective_batch_size={effective_batch_size} \
-                              --learning_rate={learning_rate} \
-                              --num_warmup_steps={num_warmup_steps} \
-                              --save_samples={save_samples} \
-                              --log_level=INFO \
-                              --max_batch_len={max_batch_len} \
-                              --seed={seed} \
-                              --cpu_offload_optimizer \
-                              --cpu_offload_params_fsdp \
-                              --distributed_training_framework fsdp \
-                              --checkpoint_at_epoch
-                      command:
-                        - /bin/bash
-                        - '-c'
-                        - '--'
-                      image: {image}
-                      name: pytorch
-                      volumeMounts:
-                        - mountPath: /input_data
-                          name: input-data
-                          readOnly: true
-                        - mountPath: /input_model
-                          name: model
-                          readOnly: true
-                        - mountPath: /output
-                          name: output
-                      env:
-                        - name: NNODES
-                          value: \"{nnodes}\"
-                        - name: NPROC_PER_NODE
-                          value: \"{nproc_per_node}\"
-                        - name: XDG_CACHE_HOME
-                          value: /tmp
-                        - name: TRITON_CACHE_DIR
-                          value: /tmp
-                        - name: HF_HOME
-                          value: /tmp
-                        - name: TRANSFORMERS_CACHE
-                          value: /tmp
-                      resources:
-                        requests:
-                          "nvidia.com/gpu": {nproc_per_node}
-                        limits:
-                          "nvidia.com/gpu": {nproc_per_node}
-                  volumes:
-                    - name: input-data
-                      persistentVolumeClaim:
-                        claimName: {input_pvc_name}
-                    - name: model
-                      persistentVolumeClaim:
-                        claimName: {model_pvc_name}
-                    - name: output
-                      persistentVolumeClaim:
-                        claimName: {output_pvc_name}
-            Worker:
-              replicas: {nnodes-1}
-              restartPolicy: OnFailure
-              template:
-                metadata:
-                  annotations:
-                    sidecar.istio.io/inject: 'false'
-                spec:
-                  containers:
-                    - args:
-                        - |
-                          echo "Running phase {phase_num}"
-                          echo "Using {path_to_model} model for training"
-                          echo "Using {path_to_data} data for training"
-                          mkdir -p /tmp/model;
-                          torchrun --nnodes {nnodes} \
-                            --nproc_per_node {nproc_per_node} \
-                            --node_rank \$(RANK) \
-                            --rdzv_endpoint \$(MASTER_ADDR):\$(MASTER_PORT) \
-                            -m instructlab.training.main_ds \
-                            --model_name_or_path={path_to_model} \
-                            --data_path={path_to_data} \
-                            --output_dir=/tmp/model \
-                            --num_epochs={num_epochs} \
-                            --effective_batch_size={effective_batch_size} \
-                            --learning_rate={learning_rate} \
-                            --num_warmup_steps={num_warmup_steps} \
-                            --save_samples={save_samples} \
-                            --log_level=INFO \
-                            --max_batch_len={max_batch_len} \
-                            --seed={seed} \
-                            --cpu_offload_optimizer \
-                            --cpu_offload_params_fsdp \
-                            --distributed_training_framework fsdp \
-                            --checkpoint_at_epoch
-                      command:
-                        - /bin/bash
-                        - '-c'
-                        - '--'
-                      image: {image}
-                      name: pytorch
-                      volumeMounts:
-                        - mountPath: /input_data
-                          name: input-data
-                          readOnly: true
-                        - mountPath: /input_model
-                          name: model
-                          readOnly: true
-                        - mountPath: /output
-                          name: output
-                          readOnly: true
-                      env:
-                        - name: NNODES
-                          value: \"{nnodes}\"
-                        - name: NPROC_PER_NODE
-                          value: \"{nproc_per_node}\"
-                        - name: XDG_CACHE_HOME
-                          value: /tmp
-                        - name: TRITON_CACHE_DIR
-                          value: /tmp
-                        - name: HF_HOME
-                          value: /tmp
-                        - name: TRANSFORMERS_CACHE
-                          value: /tmp
-                      resources:
-                        requests:
-                          "nvidia.com/gpu": {nproc_per_node}
-                        limits:
-                          "nvidia.com/gpu": {nproc_per_node}
-                  volumes:
-                    - name: input-data
-                      persistentVolumeClaim:
-                        claimName: {input_pvc_name}
-                    - name: model
-                      persistentVolumeClaim:
-                        claimName: {model_pvc_name}
-                    - name: output
-                      persistentVolumeClaim:
-                        claimName: {output_pvc_name}
-        """
-    )
+    def training_command(output_dir: str, setup: str) -> str:
+        return (
+            f'echo "Running phase {phase_num}"\n'
+            f'echo "Using {path_to_model} model for training"\n'
+            f'echo "Using {path_to_data} data for training"\n'
+            f"{setup}"
+            f"torchrun --nnodes {nnodes} "
+            f"--nproc_per_node {nproc_per_node} "
+            "--node_rank \\$(RANK) "
+            "--rdzv_endpoint \\$(MASTER_ADDR):\\$(MASTER_PORT) "
+            "-m instructlab.training.main_ds "
+            f"--model_name_or_path={path_to_model} "
+            f"--data_path={path_to_data} "
+            f"--output_dir={output_dir} "
+            f"--num_epochs={num_epochs} "
+            f"--effective_batch_size={effective_batch_size} "
+            f"--learning_rate={learning_rate} "
+            f"--num_warmup_steps={num_warmup_steps} "
+            f"--save_samples={save_samples} "
+            "--log_level=INFO "
+            f"--max_batch_len={max_batch_len} "
+            f"--seed={seed} "
+            "--cpu_offload_optimizer "
+            "--cpu_offload_params_fsdp "
+            "--distributed_training_framework fsdp "
+            "--checkpoint_at_epoch\n"
+        )
 
-    try:
-        manifest_yaml = yaml.safe_load(manifest)
-    except yaml.YAMLError as exc:
-        raise RuntimeError(f"Error parsing manifest: {exc}") from exc
+    # The manifest is built as the object the API expects rather than as YAML text which
+    # would only be parsed back. The master writes the checkpoints to the output PVC, the
+    # workers share the rest of its replica spec.
+    master = {
+        "replicas": 1,
+        "restartPolicy": "OnFailure",
+        "template": {
+            "metadata": {"annotations": {"sidecar.istio.io/inject": "false"}},
+            "spec": {
+                "containers": [
+                    {
+                        "args": [
+                            training_command(
+                                f"/output/phase_{phase_num}/model",
+                                f"mkdir -p /output/phase_{phase_num}/model;\n"
+                                "mkdir -p /output/data;\n",
+                            )
+                        ],
+                        "command": ["/bin/bash", "-c", "--"],
+                        "image": image,
+                        "name": "pytorch",
+                        "volumeMounts": [
+                            {
+                                "mountPath": "/input_data",
+                                "name": "input-data",
+                                "readOnly": True,
+                            },
+                            {
+                                "mountPath": "/input_model",
+                                "name": "model",
+                                "readOnly": True,
+                            },
+                            {"mountPath": "/output", "name": "output"},
+                        ],
+                        "env": [
+                            {"name": "NNODES", "value": str(nnodes)},
+                            {"name": "NPROC_PER_NODE", "value": str(nproc_per_node)},
+                            {"name": "XDG_CACHE_HOME", "value": "/tmp"},
+                            {"name": "TRITON_CACHE_DIR", "value": "/tmp"},
+                            {"name": "HF_HOME", "value": "/tmp"},
+                            {"name": "TRANSFORMERS_CACHE", "value": "/tmp"},
+                        ],
+                        "resources": {
+                            "requests": {"nvidia.com/gpu": nproc_per_node},
+                            "limits": {"nvidia.com/gpu": nproc_per_node},
+                        },
+                    }
+                ],
+                "volumes": [
+                    {
+                        "name": "input-data",
+                        "persistentVolumeClaim": {"claimName": input_pvc_name},
+                    },
+                    {
+                        "name": "model",
+                        "persistentVolumeClaim": {"claimName": model_pvc_name},
+                    },
+                    {
+                        "name": "output",
+                        "persistentVolumeClaim": {"claimName": output_pvc_name},
+                    },
+                ],
+            },
+        },
+    }
+
+    worker = copy.deepcopy(master)
+    worker["replicas"] = nnodes - 1
+    worker_container = worker["template"]["spec"]["containers"][0]
+    worker_container["args"] = [
+        training_command("/tmp/model", "mkdir -p /tmp/model;\n")
+    ]
+    for volume_mount in worker_container["volumeMounts"]:
+        volume_mount["readOnly"] = True
+
+    manifest = {
+        "apiVersion": "kubeflow.org/v1",
+        "kind": "PyTorchJob",
+        "metadata": {"name": name},
+        "spec": {
+            "nprocPerNode": str(nproc_per_node),
+            "pytorchReplicaSpecs": {"Master": master, "Worker": worker},
+        },
+    }
 
     # Discover the namespace in which the pod is running
     with open(
@@ -365,21 +293,25 @@ def pytorchjob_manifest_op(
             version="v1",
             namespace=namespace,
             plural="pytorchjobs",
-            body=manifest_yaml,
+            body=manifest,
         )
     except kubernetes.client.rest.ApiException as exc:
         if exc.status == 409:
             print(
                 "{} '{}/{}' already exists.".format(
-                    manifest_yaml["kind"],
+                    manifest["kind"],
                     namespace,
-                    manifest_yaml["metadata"]["name"],
+                    manifest["metadata"]["name"],
                 )
             )
         else:
             raise
 
-    # Get the CR status and wait for it to be completed
+    # Get the CR status and wait for it to be completed. The watch is scoped to this job
+    # with a field selector so the apiserver only sends its events, and it resumes from the
+    # last seen resourceVersion instead of replaying the job state on every reconnect.
+    pytorchjob_name = manifest["metadata"]["name"]
+    resource_version = None
     w = kubernetes.watch.Watch()
     exit_flag = False
     start_time = time.time()
@@ -399,15 +331,12 @@ def pytorchjob_manifest_op(
                 version="v1",
                 namespace=namespace,
                 plural="pytorchjobs",
-                timeout_seconds=60,  # Timeout after 1 minute
+                field_selector=f"metadata.name={pytorchjob_name}",
+                resource_version=resource_version,
+                timeout_seconds=3600,  # Timeout after 1 hour
             ):
                 pytorchjob_event = event["object"]
-                if (
-                    pytorchjob_event["metadata"]["name"]
-                    != manifest_yaml["metadata"]["name"]
-                ):
-                    continue
-                pytorchjob_name = pytorchjob_event["metadata"]["name"]
+                resource_version = pytorchjob_event["metadata"]["resourceVersion"]
 
                 if (
                     "status" not in pytorchjob_event
@@ -434,6 +363,11 @@ def pytorchjob_manifest_op(
                         w.stop()
                         raise RuntimeError("Job failed.")
         except kubernetes.client.exceptions.ApiException as e:
+            # 410 Gone: the resourceVersion is too old, re-list to get a fresh one
+            if e.status == 410:
+                print("Watch resourceVersion expired, re-listing the PytorchJob")
+                resource_version = None
+                continue
             print(f"API exception occurred: {str(e)}")
             time.sleep(5)  # Backoff before retrying
         # Catches the following error:
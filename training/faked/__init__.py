@@ -1,13 +1,11 @@
 from .components import (
     data_processing_op,
-    knowledge_processed_data_to_artifact_op,
+    processed_data_to_artifacts_op,
     pytorchjob_manifest_op,
-    skills_processed_data_to_artifact_op,
 )
 
 __all__ = [
     "data_processing_op",
     "pytorchjob_manifest_op",
-    "skills_processed_data_to_artifact_op",
-    "knowledge_processed_data_to_artifact_op",
+    "processed_data_to_artifacts_op",
 ]
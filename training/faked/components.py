@@ -32,24 +32,18 @@ def data_processing_op(
 
 
 @dsl.container_component
-def skills_processed_data_to_artifact_op(
+def processed_data_to_artifacts_op(
     skills_processed_data: dsl.Output[dsl.Dataset],
-    pvc_path: str = "/data/skills",
-):
-    return dsl.ContainerSpec(
-        TOOLBOX_IMAGE,
-        ["/bin/sh", "-c"],
-        [f"cp -r {pvc_path} {skills_processed_data.path}"],
-    )
-
-
-@dsl.container_component
-def knowledge_processed_data_to_artifact_op(
     knowledge_processed_data: dsl.Output[dsl.Dataset],
-    pvc_path: str = "/data/knowledge",
+    skills_path: str = "/data/skills",
+    knowledge_path: str = "/data/knowledge",
 ):
+    # Both datasets live on the same PVC, export them from a single pod
     return dsl.ContainerSpec(
         TOOLBOX_IMAGE,
         ["/bin/sh", "-c"],
-        [f"cp -r {pvc_path} {knowledge_processed_data.path}"],
+        [
+            f"cp -r {skills_path} {skills_processed_data.path} && "
+            f"cp -r {knowledge_path} {knowledge_processed_data.path}"
+        ],
     )
@@ -1,15 +1,27 @@
-from . import faked
-from .components import (
-    ilab_importer_op,
-    model_to_pvc_op,
-    pvc_to_model_op,
-    pvc_to_mt_bench_op,
-)
-
-__all__ = [
-    "model_to_pvc_op",
-    "pvc_to_mt_bench_op",
-    "pvc_to_model_op",
-    "ilab_importer_op",
-    "faked",
-]
+import importlib
+
+# The components are only imported when first accessed: every component module imports
+# utils.consts, which would otherwise load utils.components and the faked components too
+_LAZY_ATTRIBUTES = {
+    "model_to_pvc_op": ".components",
+    "pvc_to_outputs_op": ".components",
+    "ilab_importer_op": ".components",
+    "delete_pvcs_op": ".components",
+    "faked": ".faked",
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module(module_name, __name__)
+    value = module if name == "faked" else getattr(module, name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
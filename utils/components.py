@@ -3,33 +3,43 @@
 
 from kfp import dsl
 
-from .consts import RHELAI_IMAGE, TOOLBOX_IMAGE
+from .consts import OC_IMAGE, RHELAI_IMAGE, TOOLBOX_IMAGE
 
 
 @dsl.container_component
-def pvc_to_mt_bench_op(mt_bench_output: dsl.Output[dsl.Artifact], pvc_path: str):
+def pvc_to_outputs_op(
+    model: dsl.Output[dsl.Model],
+    mt_bench_output: dsl.Output[dsl.Artifact],
+    model_pvc_path: str,
+    mt_bench_pvc_path: str,
+):
+    # The model and the MT-Bench results live on the same PVC, export them from a single pod
     return dsl.ContainerSpec(
         TOOLBOX_IMAGE,
         ["/bin/sh", "-c"],
-        [f"cp -r {pvc_path} {mt_bench_output.path}"],
-    )
-
-
-@dsl.container_component
-def pvc_to_model_op(model: dsl.Output[dsl.Model], pvc_path: str):
-    return dsl.ContainerSpec(
-        TOOLBOX_IMAGE,
-        ["/bin/sh", "-c"],
-        [f"cp -r {pvc_path} {model.path}"],
+        [
+            f"cp -rL {model_pvc_path} {model.path} && "
+            f"cp -r {mt_bench_pvc_path} {mt_bench_output.path}"
+        ],
     )
 
 
 @dsl.container_component
 def model_to_pvc_op(model: dsl.Input[dsl.Model], pvc_path: str = "/model"):
+    # Model repositories often ship the same weights in several formats, when safetensors
+    # weights are present anywhere in the model, only those are copied to the PVC. Hidden
+    # top-level entries such as .git or .cache are left out, like the former "cp -r model/*".
+    # pipefail makes a failed read of the model fail the copy, not only a failed extraction.
     return dsl.ContainerSpec(
         TOOLBOX_IMAGE,
-        ["/bin/sh", "-c"],
-        [f"cp -r {model.path}/* {pvc_path}"],
+        ["/bin/bash", "-o", "pipefail", "-c"],
+        [
+            f"cd {model.path} && "
+            "if [ -n \"$(find . -name '*.safetensors' -print -quit)\" ]; then "
+            "set -- '--exclude=*.bin' '--exclude=*.pt' '--exclude=*.pth' '--exclude=*.h5' "
+            "'--exclude=*.msgpack' '--exclude=*.onnx' '--exclude=*.gguf'; fi && "
+            f"tar -cf - '--exclude=./.*' \"$@\" . | tar -xf - -C {pvc_path}"
+        ],
     )
 
 
@@ -42,3 +52,14 @@ def ilab_importer_op(repository: str, release: str, base_model: dsl.Output[dsl.M
             f"ilab --config=DEFAULT model download --repository {repository} --release {release} --model-dir {base_model.path}"
         ],
     )
+
+
+@dsl.container_component
+def delete_pvcs_op(output_pvc_name: str, input_pvc_name: str, model_pvc_name: str):
+    # oc runs with the service account of the task pod and in its namespace, which must be
+    # allowed to delete PVCs, see the README
+    return dsl.ContainerSpec(
+        OC_IMAGE,
+        ["/bin/sh", "-c", 'oc delete pvc --ignore-not-found --wait=false "$@"', "--"],
+        [output_pvc_name, input_pvc_name, model_pvc_name],
+    )
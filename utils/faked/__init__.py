@@ -1,11 +1,9 @@
 from .components import (
     model_to_pvc_op,
-    pvc_to_model_op,
-    pvc_to_mt_bench_op,
+    pvc_to_outputs_op,
 )
 
 __all__ = [
-    "pvc_to_mt_bench_op",
-    "pvc_to_model_op",
+    "pvc_to_outputs_op",
     "model_to_pvc_op",
 ]
@@ -11,10 +11,10 @@ def model_to_pvc_op(model: dsl.Input[dsl.Model], pvc_path: str = "/model"):
 
 
 @dsl.component(base_image=PYTHON_IMAGE, install_kfp_package=False)
-def pvc_to_mt_bench_op(mt_bench_output: dsl.Output[dsl.Artifact], pvc_path: str):
-    return
-
-
-@dsl.component(base_image=PYTHON_IMAGE, install_kfp_package=False)
-def pvc_to_model_op(model: dsl.Output[dsl.Model], pvc_path: str):
+def pvc_to_outputs_op(
+    model: dsl.Output[dsl.Model],
+    mt_bench_output: dsl.Output[dsl.Artifact],
+    model_pvc_path: str,
+    mt_bench_pvc_path: str,
+):
     return